@@ -15,12 +15,32 @@ def create_app(config_class=None):
 
     db.init_app(app)
 
-    from app.models import Todo  # noqa: F401
+    from app.cache import TodoCache
+    app.extensions['todo_cache'] = TodoCache(
+        maxsize=app.config['TODO_CACHE_SIZE'],
+        ttl=app.config['TODO_CACHE_TTL'],
+    )
+
+    from app.models import IdempotencyKey, Job, Todo, TodoChange  # noqa: F401
 
     with app.app_context():
         db.create_all()
 
+    from app.repository import make_repository
+    app.extensions['todo_repository'] = make_repository(app)
+
     from app.routes import todo_bp
     app.register_blueprint(todo_bp)
 
+    from app.assets import assets_cli, init_assets
+    init_assets(app)
+    app.cli.add_command(assets_cli)
+
+    from app.jobs import jobs_cli
+    app.cli.add_command(jobs_cli)
+
+    from app.profiling import init_profiling, profiles_cli
+    init_profiling(app)
+    app.cli.add_command(profiles_cli)
+
     return app
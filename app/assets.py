@@ -0,0 +1,154 @@
+"""Fingerprinted, pre-compressed frontend bundles.
+
+``flask assets build`` (or ``python -m app.assets``) minifies the files in
+``ASSETS``, writes each to ``static/dist/<hash>/<name>`` with ``.gz`` and,
+when the optional ``brotli`` package is installed, ``.br`` siblings, and
+records the mapping in ``static/dist/manifest.json``.  Templates call
+``asset_url(name)``, which falls back to the plain static file when no
+manifest has been built or ``DEBUG`` is set.  Because a fingerprinted URL
+never changes content, ``/static/dist/`` is served with an immutable
+one-year lifetime.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+from werkzeug.exceptions import NotFound
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+ASSETS = ('css/style.css', 'js/app.js')
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+assets_cli = AppGroup('assets', help='Build fingerprinted static assets.')
+
+
+def minify_css(source: str) -> str:
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source: str) -> str:
+    # Line-preserving so automatic semicolon insertion is unaffected.
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(
+        line for line in lines if line and not line.startswith('//')
+    ) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build_assets(static_folder: str, names=ASSETS) -> dict:
+    """Write the fingerprinted bundles and return the manifest."""
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+
+    for name in names:
+        with open(os.path.join(static_folder, name), encoding='utf-8') as f:
+            source = f.read()
+        minify = MINIFIERS.get(os.path.splitext(name)[1])
+        data = (minify(source) if minify else source).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:12]
+
+        target = f'{DIST_DIR}/{digest}/{name}'
+        path = os.path.join(static_folder, target)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        with open(f'{path}.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(f'{path}.br', 'wb') as f:
+                f.write(brotli.compress(data))
+        manifest[name] = target
+
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder: str) -> dict:
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def asset_url(name: str) -> str:
+    manifest = current_app.extensions['asset_manifest']
+    return url_for('static', filename=manifest.get(name, name))
+
+
+def serve_dist(filename: str):
+    """Serve a fingerprinted file, preferring a pre-compressed variant."""
+    dist = os.path.join(current_app.static_folder, DIST_DIR)
+    digest = filename.split('/', 1)[0]
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    accepted = request.accept_encodings
+
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        variant = f'{filename}{suffix}'
+        if accepted[encoding] and os.path.isfile(os.path.join(dist, variant)):
+            response = send_from_directory(
+                dist, variant, mimetype=mimetype,
+                etag=f'{digest}-{encoding}', max_age=IMMUTABLE_MAX_AGE,
+            )
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        if filename.endswith(MANIFEST):
+            raise NotFound()
+        response = send_from_directory(
+            dist, filename, mimetype=mimetype,
+            etag=digest, max_age=IMMUTABLE_MAX_AGE,
+        )
+
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app) -> None:
+    # In debug the plain sources are served, so edits show up without a
+    # rebuild instead of hiding behind a stale bundle from an earlier build.
+    manifest = {} if app.debug else load_manifest(app.static_folder)
+    app.extensions['asset_manifest'] = manifest
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.add_url_rule(
+        f'{app.static_url_path}/{DIST_DIR}/<path:filename>',
+        endpoint='dist', view_func=serve_dist,
+    )
+
+
+@assets_cli.command('build')
+def build_command():
+    """Minify, fingerprint and compress the frontend assets."""
+    manifest = build_assets(current_app.static_folder)
+    for name, target in manifest.items():
+        click.echo(f'{name} -> {target}')
+    if brotli is None:
+        click.echo('brotli not installed; wrote gzip variants only')
+
+
+if __name__ == '__main__':
+    static = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    for name, target in build_assets(static).items():
+        print(f'{name} -> {target}')
@@ -0,0 +1,111 @@
+import fcntl
+import mmap
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+
+class TodoCache:
+    """Bounded LRU/TTL cache of serialized todos, local to one worker.
+
+    The cache itself knows nothing about the database; the repository
+    invalidates entries as it sees writes in the shared ``todo_change`` log.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, todo_id: int):
+        with self._lock:
+            entry = self._entries.get(todo_id)
+            if entry is not None:
+                data, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(todo_id)
+                    self.hits += 1
+                    return data
+                del self._entries[todo_id]
+            self.misses += 1
+            return None
+
+    def set(self, todo_id: int, data: dict) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[todo_id] = (data, time.monotonic() + self.ttl)
+            self._entries.move_to_end(todo_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, todo_id: int) -> None:
+        with self._lock:
+            self._entries.pop(todo_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+            }
+
+
+class ChangeSignal:
+    """Write counter shared by every worker on the host through a mmap.
+
+    Writers ``bump()`` it after committing; readers compare ``value()`` with
+    the value they last synced at, which is a memory read rather than a
+    query.  Without a path the counter is local to the process, which is
+    enough for databases no other process can open (``sqlite://``).
+    """
+
+    _FORMAT = '<Q'
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._local = 0
+        self._file = None
+        self._map = None
+        self._lock = threading.Lock()
+        if path is not None:
+            self._file = open(path, 'a+b')
+            size = struct.calcsize(self._FORMAT)
+            if self._file.seek(0, 2) < size:
+                self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+
+    def value(self) -> int:
+        if self._map is None:
+            return self._local
+        return struct.unpack_from(self._FORMAT, self._map)[0]
+
+    def bump(self) -> None:
+        with self._lock:
+            if self._map is None:
+                self._local += 1
+                return
+            # lockf locks are per process, so they also hold between
+            # workers that inherited the descriptor from a preloading master.
+            fcntl.lockf(self._file, fcntl.LOCK_EX)
+            try:
+                struct.pack_into(self._FORMAT, self._map, 0, self.value() + 1)
+            finally:
+                fcntl.lockf(self._file, fcntl.LOCK_UN)
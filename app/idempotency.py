@@ -0,0 +1,188 @@
+"""``Idempotency-Key`` handling for mutating routes.
+
+The first request with a key reserves it and stores its response.
+Retries with the same key and payload replay the stored response without
+running the view. The same key with a different payload is rejected.
+A reservation whose request never finished can be taken over after
+``IDEMPOTENCY_LOCK_SECONDS``; completed keys expire after ``IDEMPOTENCY_TTL``
+and are purged every ``PURGE_EVERY`` new reservations.
+
+With the SQLAlchemy backend the stored response commits in the same
+transaction as the todo write.  A request that outlives its lock is rolled
+back rather than racing the retry that took its key over.  The memory
+backend cannot roll its writes back, so there a slow request can still be
+repeated by a retry after ``IDEMPOTENCY_LOCK_SECONDS``.
+"""
+import hashlib
+import itertools
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.jobs import task
+from app.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Purge expired keys on every N-th new reservation in this process.
+PURGE_EVERY = 256
+
+_reservations = itertools.count(1)
+
+
+def _fingerprint() -> str:
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.full_path.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _reserve(key: str, fingerprint: str, locked_until: datetime):
+    """Insert an in-progress record, or return the existing live one.
+
+    An in-progress record whose lock has lapsed (its request presumably
+    died) is taken over by a retry with the same payload.  ``locked_until``
+    doubles as the owner's fencing value for the later store or release.
+    """
+    now = datetime.utcnow()
+    record = db.session.get(IdempotencyKey, key)
+    if record is not None and record.expires_at <= now:
+        db.session.delete(record)
+        db.session.commit()
+        record = None
+    if record is not None:
+        if record.status_code is None and record.fingerprint == fingerprint:
+            taken = db.session.execute(
+                db.update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code.is_(None),
+                    IdempotencyKey.locked_until <= now,
+                )
+                .values(locked_until=locked_until)
+            )
+            db.session.commit()
+            if taken.rowcount:
+                return None
+            db.session.refresh(record)
+        return record
+
+    ttl = current_app.config['IDEMPOTENCY_TTL']
+    db.session.add(IdempotencyKey(
+        key=key,
+        fingerprint=fingerprint,
+        expires_at=now + timedelta(seconds=ttl),
+        locked_until=locked_until,
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return db.session.get(IdempotencyKey, key)
+
+    # Nothing schedules the purge task, so new keys pay for old ones.
+    if next(_reservations) % PURGE_EVERY == 0:
+        purge_expired(now)
+    return None
+
+
+class _Superseded(Exception):
+    pass
+
+
+def _owned(key: str, locked_until: datetime):
+    """Match the record only while this request still holds its lock."""
+    return (
+        IdempotencyKey.key == key,
+        IdempotencyKey.status_code.is_(None),
+        IdempotencyKey.locked_until == locked_until,
+    )
+
+
+def _release(key: str, locked_until: datetime) -> None:
+    db.session.rollback()
+    db.session.execute(
+        db.delete(IdempotencyKey).where(*_owned(key, locked_until))
+    )
+    db.session.commit()
+
+
+def idempotent(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify(
+                {'error': f'{HEADER} must be 1-{MAX_KEY_LENGTH} characters'}
+            ), 400
+
+        fingerprint = _fingerprint()
+        lock = current_app.config['IDEMPOTENCY_LOCK_SECONDS']
+        locked_until = datetime.utcnow() + timedelta(seconds=lock)
+        existing = _reserve(key, fingerprint, locked_until)
+        if existing is not None:
+            if existing.fingerprint != fingerprint:
+                return jsonify(
+                    {'error': f'{HEADER} was used with a different request'}
+                ), 422
+            if existing.status_code is None:
+                return jsonify(
+                    {'error': f'A request with this {HEADER} is in progress'}
+                ), 409
+            response = current_app.response_class(
+                existing.body, status=existing.status_code,
+                mimetype='application/json',
+            )
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        # The stored response commits in the same transaction as the
+        # view's writes, so a crash between them cannot leave a mutation
+        # that a retry would run again.
+        try:
+            with current_app.extensions['todo_repository'].atomic():
+                response = make_response(view(*args, **kwargs))
+                if response.status_code >= 500:
+                    outcome = db.delete(IdempotencyKey)
+                else:
+                    outcome = db.update(IdempotencyKey).values(
+                        status_code=response.status_code,
+                        body=response.get_data(as_text=True),
+                        locked_until=None,
+                    )
+                owned = db.session.execute(outcome.where(*_owned(key, locked_until)))
+                if not owned.rowcount:
+                    raise _Superseded()
+        except _Superseded:
+            # Our lock lapsed and a retry took the key over; it owns the
+            # mutation, so ours was rolled back.
+            return jsonify(
+                {'error': f'A retry with this {HEADER} took over the request'}
+            ), 409
+        except Exception:
+            _release(key, locked_until)
+            raise
+        return response
+
+    return wrapper
+
+
+def purge_expired(now: datetime = None) -> int:
+    result = db.session.execute(
+        db.delete(IdempotencyKey)
+        .where(IdempotencyKey.expires_at <= (now or datetime.utcnow()))
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+@task('purge_idempotency_keys')
+def purge_idempotency_keys(ctx) -> dict:
+    """Delete expired idempotency records; uses the expires_at index."""
+    return {'deleted': purge_expired()}
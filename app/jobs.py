@@ -0,0 +1,387 @@
+"""SQLite-backed background jobs executed outside the request workers.
+
+Jobs are rows in the ``job`` table.  ``flask jobs worker`` claims them with
+an atomic conditional UPDATE and runs each task in a process pool, so CPU
+heavy maintenance never shares an interpreter with request handling.
+"""
+import json
+import pickle
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app import db
+from app.models import Job, Todo
+
+TASKS = {}
+
+jobs_cli = AppGroup('jobs', help='Manage background jobs.')
+
+
+def task(name: str = None):
+    """Register a module-level function as a job task.
+
+    The function is called as ``func(ctx, **args)`` inside a pool process
+    with an application context pushed; ``ctx`` is a :class:`JobContext`.
+    """
+    def decorator(func):
+        TASKS[name or func.__name__] = func
+        return func
+    return decorator
+
+
+def enqueue(name: str, max_attempts: int = None, **args) -> Job:
+    if name not in TASKS:
+        raise KeyError(f'Unknown task: {name}')
+    if max_attempts is None:
+        max_attempts = current_app.config['JOB_MAX_ATTEMPTS']
+    job = Job(name=name, args=json.dumps(args), max_attempts=max_attempts)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+class JobContext:
+    def __init__(self, job_id: int, claim_token: str, lease_seconds: float):
+        self.job_id = job_id
+        self.claim_token = claim_token
+        self.lease_seconds = lease_seconds
+
+    def report(self, progress: float, message: str = '') -> None:
+        """Persist progress (0.0-1.0) and extend the job's lease."""
+        db.session.execute(
+            db.update(Job)
+            .where(Job.id == self.job_id, Job.claim_token == self.claim_token)
+            .values(
+                progress=max(0.0, min(1.0, progress)),
+                message=message[:200],
+                lease_expires_at=_lease_deadline(self.lease_seconds),
+            )
+        )
+        db.session.commit()
+
+
+class ConfigSnapshot:
+    """Picklable copy of an app config used to rebuild the app in children."""
+
+    def __init__(self, config):
+        for key, value in config.items():
+            if not key.isupper():
+                continue
+            try:
+                pickle.dumps(value)
+            except Exception:
+                continue
+            setattr(self, key, value)
+
+
+_pool_app = None
+
+
+def _init_pool(snapshot: ConfigSnapshot) -> None:
+    global _pool_app
+    from app import create_app
+    _pool_app = create_app(snapshot)
+
+
+def _execute(job_id: int, claim_token: str, func, args: dict, lease_seconds: float):
+    with _pool_app.app_context():
+        try:
+            return func(JobContext(job_id, claim_token, lease_seconds), **args)
+        finally:
+            db.session.remove()
+
+
+def _make_pool(concurrency: int, config) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=concurrency,
+        initializer=_init_pool,
+        initargs=(ConfigSnapshot(config),),
+    )
+
+
+def _lease_deadline(seconds: float) -> datetime:
+    return datetime.utcnow() + timedelta(seconds=seconds)
+
+
+def claim_next(lease_seconds: float):
+    """Atomically move the next runnable job to ``running``.
+
+    Jobs whose lease expired (their worker died) are reclaimed as well,
+    unless they have used up their attempts, in which case they fail.
+    """
+    now = datetime.utcnow()
+    expired = db.and_(Job.status == Job.RUNNING, Job.lease_expires_at < now)
+    db.session.execute(
+        db.update(Job)
+        .where(expired, Job.attempts >= Job.max_attempts)
+        .values(
+            status=Job.FAILED, error='Lease expired on the final attempt',
+            finished_at=now, lease_expires_at=None, claim_token=None,
+        )
+    )
+    db.session.commit()
+
+    reclaimable = db.and_(expired, Job.attempts < Job.max_attempts)
+    candidates = db.session.execute(
+        db.select(Job.id)
+        .where(
+            db.or_(
+                db.and_(Job.status == Job.QUEUED, Job.run_after <= now),
+                reclaimable,
+            )
+        )
+        .order_by(Job.run_after, Job.id)
+        .limit(10)
+    ).scalars().all()
+
+    for job_id in candidates:
+        token = uuid.uuid4().hex
+        claimed = db.session.execute(
+            db.update(Job)
+            .where(
+                Job.id == job_id,
+                db.or_(Job.status == Job.QUEUED, reclaimable),
+            )
+            .values(
+                status=Job.RUNNING,
+                attempts=Job.attempts + 1,
+                started_at=now,
+                lease_expires_at=_lease_deadline(lease_seconds),
+                claim_token=token,
+            )
+        )
+        db.session.commit()
+        if claimed.rowcount:
+            return db.session.get(Job, job_id)
+    return None
+
+
+def renew_leases(claims, lease_seconds: float) -> None:
+    """Extend the lease of every ``(job_id, claim_token)`` still held."""
+    deadline = _lease_deadline(lease_seconds)
+    for job_id, token in claims:
+        db.session.execute(
+            db.update(Job)
+            .where(Job.id == job_id, Job.claim_token == token)
+            .values(lease_expires_at=deadline)
+        )
+    db.session.commit()
+
+
+def finish(job_id: int, claim_token: str, result=None,
+           error: BaseException = None) -> bool:
+    """Record the outcome if this worker still holds the claim.
+
+    Returns ``False`` when the job was reclaimed by another worker, in
+    which case the row is left to the new holder.
+    """
+    job = db.session.get(Job, job_id)
+    db.session.refresh(job)
+    now = datetime.utcnow()
+    values = {'lease_expires_at': None, 'claim_token': None}
+    if error is None:
+        values.update(
+            status=Job.SUCCEEDED, progress=1.0, result=json.dumps(result),
+            error=None, finished_at=now,
+        )
+    elif job.attempts < job.max_attempts:
+        backoff = current_app.config['JOB_RETRY_BACKOFF'] * 2 ** (job.attempts - 1)
+        values.update(
+            status=Job.QUEUED, error=repr(error),
+            run_after=now + timedelta(seconds=backoff),
+        )
+    else:
+        values.update(status=Job.FAILED, error=repr(error), finished_at=now)
+
+    updated = db.session.execute(
+        db.update(Job)
+        .where(Job.id == job_id, Job.claim_token == claim_token)
+        .values(**values)
+    )
+    db.session.commit()
+    if not updated.rowcount:
+        current_app.logger.warning('Job %s was reclaimed; dropping its result', job_id)
+        return False
+    return True
+
+
+def requeue(job_id: int, claim_token: str) -> None:
+    """Hand back a claimed job that never started, refunding its attempt."""
+    db.session.execute(
+        db.update(Job)
+        .where(Job.id == job_id, Job.claim_token == claim_token)
+        .values(
+            status=Job.QUEUED, attempts=Job.attempts - 1,
+            lease_expires_at=None, claim_token=None,
+        )
+    )
+    db.session.commit()
+
+
+def _record(job_id: int, claim_token: str, result=None,
+            error: BaseException = None) -> None:
+    """Call :func:`finish` without letting its failures stop the worker."""
+    try:
+        finish(job_id, claim_token, result, error)
+    except Exception as exc:
+        db.session.rollback()
+        current_app.logger.exception('Could not record job %s', job_id)
+        if error is None:
+            # E.g. a result json.dumps cannot encode: fail the attempt.
+            _record(job_id, claim_token, error=exc)
+
+
+def run_worker(concurrency: int = None, once: bool = False,
+               poll_interval: float = None) -> int:
+    """Process jobs until interrupted; with ``once`` stop when idle.
+
+    Returns the number of jobs that reached a terminal state or were
+    rescheduled for retry.
+    """
+    config = current_app.config
+    concurrency = concurrency or config['JOB_CONCURRENCY']
+    poll_interval = config['JOB_POLL_INTERVAL'] if poll_interval is None else poll_interval
+    lease_seconds = config['JOB_LEASE_SECONDS']
+    processed = 0
+    running = {}
+    renewed_at = time.monotonic()
+    pool = _make_pool(concurrency, config)
+
+    try:
+        while True:
+            broken = False
+            while len(running) < concurrency:
+                job = claim_next(lease_seconds)
+                if job is None:
+                    break
+                func = TASKS.get(job.name)
+                if func is None:
+                    _record(job.id, job.claim_token,
+                            error=KeyError(f'Unknown task: {job.name}'))
+                    processed += 1
+                    continue
+                try:
+                    future = pool.submit(
+                        _execute, job.id, job.claim_token, func,
+                        json.loads(job.args), lease_seconds,
+                    )
+                except BrokenProcessPool:
+                    requeue(job.id, job.claim_token)
+                    broken = True
+                    break
+                running[future] = (job.id, job.claim_token)
+
+            if not running and not broken:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            if broken or any(
+                isinstance(future.exception(), BrokenProcessPool) for future in done
+            ):
+                # A task killed its pool process, which fails every future
+                # in the pool; the culprit cannot be told apart, so each
+                # job is retried as a failed attempt and the pool rebuilt.
+                broken = True
+                wait(running)
+                done = set(running)
+
+            for future in done:
+                job_id, token = running.pop(future)
+                error = future.exception()
+                _record(job_id, token, None if error else future.result(), error)
+                processed += 1
+
+            if broken:
+                current_app.logger.warning('Job pool broke; starting a new one')
+                pool.shutdown(wait=False)
+                pool = _make_pool(concurrency, config)
+
+            # Tasks need not report progress to keep their jobs; the loop
+            # renews every held lease well before it can expire.
+            if running and time.monotonic() - renewed_at >= lease_seconds / 3:
+                renew_leases(running.values(), lease_seconds)
+                renewed_at = time.monotonic()
+    finally:
+        pool.shutdown()
+
+    return processed
+
+
+@task('recount')
+def recount(ctx: JobContext, batch_size: int = 1000) -> dict:
+    """Count todos by status in id-ordered batches, reporting progress."""
+    total = db.session.execute(db.select(db.func.count(Todo.id))).scalar()
+    counts = {'total': total, 'active': 0, 'completed': 0}
+    last_id = 0
+    seen = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Todo.id, Todo.completed)
+            .where(Todo.id > last_id)
+            .order_by(Todo.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        for todo_id, completed in rows:
+            counts['completed' if completed else 'active'] += 1
+        last_id = rows[-1][0]
+        seen += len(rows)
+        ctx.report(seen / total if total else 1.0, f'{seen}/{total} todos')
+    return counts
+
+
+@jobs_cli.command('worker')
+@click.option('--concurrency', type=int, default=None,
+              help='Maximum number of jobs running at once.')
+@click.option('--once', is_flag=True, help='Exit when the queue is empty.')
+def worker_command(concurrency, once):
+    """Run queued jobs in a process pool."""
+    processed = run_worker(concurrency=concurrency, once=once)
+    click.echo(f'Processed {processed} job(s)')
+
+
+@jobs_cli.command('enqueue')
+@click.argument('name')
+@click.option('--arg', 'raw_args', multiple=True, metavar='KEY=JSON',
+              help='Task argument; the value is parsed as JSON if possible.')
+def enqueue_command(name, raw_args):
+    """Queue a registered task."""
+    args = {}
+    for raw in raw_args:
+        key, _, value = raw.partition('=')
+        try:
+            args[key] = json.loads(value)
+        except ValueError:
+            args[key] = value
+    try:
+        job = enqueue(name, **args)
+    except KeyError as exc:
+        raise click.ClickException(exc.args[0])
+    click.echo(f'Queued job {job.id}')
+
+
+@jobs_cli.command('list')
+@click.option('--status', type=click.Choice(
+    [Job.QUEUED, Job.RUNNING, Job.SUCCEEDED, Job.FAILED]))
+def list_command(status):
+    """Show recent jobs and their progress."""
+    query = db.select(Job).order_by(Job.id.desc()).limit(50)
+    if status:
+        query = query.where(Job.status == status)
+    for job in db.session.execute(query).scalars():
+        click.echo(
+            f'{job.id:>5}  {job.name:<20} {job.status:<10} '
+            f'{job.progress * 100:5.1f}%  {job.attempts}/{job.max_attempts}  '
+            f'{job.message or job.error or ""}'
+        )
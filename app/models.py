@@ -1,9 +1,14 @@
+import json
 from datetime import datetime
 
 from app import db
 
 
 class Todo(db.Model):
+    FIELDS = (
+        'id', 'title', 'description', 'completed', 'created_at', 'updated_at',
+    )
+
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.String(500), nullable=True, default='')
@@ -13,15 +18,105 @@ class Todo(db.Model):
         db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
 
+    def to_dict(self, fields=None) -> dict:
+        result = {}
+        for field in fields or self.FIELDS:
+            value = getattr(self, field)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            result[field] = value
+        return result
+
+    def __repr__(self) -> str:
+        return f'<Todo {self.id}: {self.title}>'
+
+
+class TodoChange(db.Model):
+    """Append-only log of todo writes, polled by every worker's cache."""
+
+    __tablename__ = 'todo_change'
+    # Never reuse a sequence number, even after pruning the newest rows.
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    todo_id = db.Column(db.Integer, nullable=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    @classmethod
+    def latest_seq(cls) -> int:
+        return db.session.execute(db.select(db.func.max(cls.seq))).scalar() or 0
+
+    @classmethod
+    def since(cls, seq: int) -> list:
+        return db.session.execute(
+            db.select(cls.seq, cls.todo_id).where(cls.seq > seq).order_by(cls.seq)
+        ).all()
+
+    @classmethod
+    def prune(cls, before: datetime) -> None:
+        db.session.execute(db.delete(cls).where(cls.changed_at < before))
+
+
+class Job(db.Model):
+    """A durable unit of background work picked up by ``flask jobs worker``."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    name = db.Column(db.String(100), nullable=False)
+    args = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), nullable=False, default=QUEUED, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    message = db.Column(db.String(200), nullable=True, default='')
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    # Set on every claim; only the holder may extend the lease or finish.
+    claim_token = db.Column(db.String(32), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
     def to_dict(self) -> dict:
         return {
             'id': self.id,
-            'title': self.title,
-            'description': self.description,
-            'completed': self.completed,
+            'name': self.name,
+            'args': json.loads(self.args),
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'progress': self.progress,
+            'message': self.message,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
         }
 
     def __repr__(self) -> str:
-        return f'<Todo {self.id}: {self.title}>'
+        return f'<Job {self.id}: {self.name} {self.status}>'
+
+
+class IdempotencyKey(db.Model):
+    """Stored response for a mutating request sent with ``Idempotency-Key``.
+
+    ``status_code`` is ``NULL`` while the original request is still running.
+    """
+
+    __tablename__ = 'idempotency_key'
+
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    # While in progress, a retry may take the key over after this time.
+    locked_until = db.Column(db.DateTime, nullable=True)
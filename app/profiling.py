@@ -0,0 +1,267 @@
+"""Opt-in per-request profiling.
+
+When ``PROFILING_ENABLED`` is set, requests whose profile header carries
+``PROFILE_TOKEN`` (or picked by ``PROFILE_SAMPLE_RATE``) run under cProfile
+plus a wall-clock stack sampler, and their SQL statements are timed.  Each
+capture is saved to ``PROFILE_DIR`` as ``<id>.pstats``, ``<id>.folded``
+(collapsed stacks for flamegraph tools) and ``<id>.json`` (request and SQL
+metadata); only the newest ``PROFILE_MAX_CAPTURES`` are kept.
+
+With profiling disabled no hooks are registered at all.
+"""
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+import click
+from flask import current_app, g, has_request_context, request
+from flask.cli import AppGroup
+from sqlalchemy import event
+
+from app import db
+
+profiles_cli = AppGroup('profiles', help='Inspect captured request profiles.')
+
+
+class StackSampler:
+    """Sample one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(
+                    f'{code.co_name} ({os.path.basename(code.co_filename)}:'
+                    f'{frame.f_lineno})'
+                )
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.items())
+
+
+def _wants_profile(config) -> bool:
+    # Header-triggered captures need a configured token; without one only
+    # sampling can profile, so clients cannot fill PROFILE_DIR at will.
+    header = request.headers.get(config['PROFILE_HEADER'])
+    token = config['PROFILE_TOKEN']
+    if header and token:
+        return hmac.compare_digest(header.encode(), token.encode())
+    rate = config['PROFILE_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+
+def _stop_profile(profile: dict) -> None:
+    profile['profiler'].disable()
+    profile['sampler'].stop()
+
+
+def _profile_dir(app) -> str:
+    return app.config['PROFILE_DIR'] or os.path.join(app.instance_path, 'profiles')
+
+
+def init_profiling(app) -> None:
+    if not app.config['PROFILING_ENABLED']:
+        return
+
+    @app.before_request
+    def start_profile():
+        if not _wants_profile(app.config):
+            return
+        sampler = StackSampler(
+            threading.get_ident(), app.config['PROFILE_SAMPLE_INTERVAL']
+        )
+        profiler = cProfile.Profile()
+        g.profile = {
+            'profiler': profiler,
+            'sampler': sampler,
+            'queries': [],
+            'started': time.perf_counter(),
+        }
+        sampler.start()
+        profiler.enable()
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        _stop_profile(profile)
+        duration = time.perf_counter() - profile['started']
+        directory = _profile_dir(app)
+        profile_id = save_profile(directory, profile, duration, response.status_code)
+        rotate_profiles(directory, app.config['PROFILE_MAX_CAPTURES'])
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def discard_profile(exc):
+        # after_request is skipped when an exception propagates (DEBUG,
+        # TESTING); make sure the profiler and sampler thread still stop.
+        profile = g.pop('profile', None)
+        if profile is not None:
+            _stop_profile(profile)
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        # Kept on the per-statement context: a failed statement never
+        # reaches after_cursor_execute, so nothing may outlive it.
+        if context is not None:
+            context._profile_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_profile_start', None)
+        profile = g.get('profile') if has_request_context() else None
+        if profile is not None and started is not None:
+            profile['queries'].append({
+                'statement': statement,
+                'duration': time.perf_counter() - started,
+            })
+
+
+def save_profile(directory: str, profile: dict, duration: float, status: int) -> str:
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+    profile_id = (
+        f'{datetime.utcnow():%Y%m%dT%H%M%S}-{request.method.lower()}-'
+        f'{slug}-{uuid.uuid4().hex[:8]}'
+    )
+    base = os.path.join(directory, profile_id)
+
+    profile['profiler'].dump_stats(f'{base}.pstats')
+    with open(f'{base}.folded', 'w') as f:
+        f.write(profile['sampler'].collapsed())
+    with open(f'{base}.json', 'w') as f:
+        json.dump({
+            'id': profile_id,
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'status': status,
+            'duration': duration,
+            'sql_time': sum(q['duration'] for q in profile['queries']),
+            'queries': profile['queries'],
+        }, f, indent=2)
+    return profile_id
+
+
+def rotate_profiles(directory: str, keep: int) -> None:
+    """Delete all but the newest ``keep`` captures."""
+    metas = sorted(
+        (os.path.getmtime(os.path.join(directory, name)), name[:-5])
+        for name in os.listdir(directory) if name.endswith('.json')
+    )
+    for _, profile_id in metas[:max(0, len(metas) - keep)]:
+        for ext in ('json', 'pstats', 'folded'):
+            try:
+                os.remove(os.path.join(directory, f'{profile_id}.{ext}'))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(directory: str) -> list:
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name)) as f:
+                profiles.append(json.load(f))
+    return profiles
+
+
+def function_times(path: str) -> dict:
+    """Map ``file:line(function)`` to cumulative seconds from a pstats file."""
+    stats = pstats.Stats(path)
+    return {
+        f'{os.path.basename(filename)}:{line}({name})': cumulative
+        for (filename, line, name), (_, _, _, cumulative, _) in stats.stats.items()
+    }
+
+
+def diff_profiles(base_path: str, other_path: str) -> list:
+    """Return ``(function, base, other, delta)`` sorted by largest change."""
+    base = function_times(base_path)
+    other = function_times(other_path)
+    rows = [
+        (func, base.get(func, 0.0), other.get(func, 0.0),
+         other.get(func, 0.0) - base.get(func, 0.0))
+        for func in set(base) | set(other)
+    ]
+    rows.sort(key=lambda row: abs(row[3]), reverse=True)
+    return rows
+
+
+def _resolve(directory: str, profile_id: str) -> str:
+    path = os.path.join(directory, f'{profile_id}.pstats')
+    if not os.path.exists(path):
+        raise click.ClickException(f'Unknown profile: {profile_id}')
+    return path
+
+
+@profiles_cli.command('list')
+def list_command():
+    """List captured profiles, oldest first."""
+    for meta in list_profiles(_profile_dir(current_app)):
+        click.echo(
+            f"{meta['id']}  {meta['status']}  {meta['duration'] * 1000:8.1f} ms  "
+            f"sql {meta['sql_time'] * 1000:7.1f} ms ({len(meta['queries'])})  "
+            f"{meta['method']} {meta['path']}"
+        )
+
+
+@profiles_cli.command('show')
+@click.argument('profile_id')
+@click.option('--limit', default=20, show_default=True)
+@click.option('--sort', default='cumulative', show_default=True)
+def show_command(profile_id, limit, sort):
+    """Print the hottest functions of one profile."""
+    path = _resolve(_profile_dir(current_app), profile_id)
+    pstats.Stats(path, stream=sys.stdout).sort_stats(sort).print_stats(limit)
+
+
+@profiles_cli.command('diff')
+@click.argument('base_id')
+@click.argument('other_id')
+@click.option('--limit', default=20, show_default=True)
+def diff_command(base_id, other_id, limit):
+    """Compare cumulative time per function between two profiles."""
+    directory = _profile_dir(current_app)
+    rows = diff_profiles(_resolve(directory, base_id), _resolve(directory, other_id))
+    click.echo(f"{'base ms':>10} {'other ms':>10} {'delta ms':>10}  function")
+    for func, base, other, delta in rows[:limit]:
+        click.echo(
+            f'{base * 1000:10.2f} {other * 1000:10.2f} {delta * 1000:+10.2f}  {func}'
+        )
@@ -0,0 +1,435 @@
+"""Storage backends behind the todo routes.
+
+``TODO_STORAGE`` selects the backend: ``sqlalchemy`` (default) persists to
+the configured database, ``memory`` keeps todos in process memory for
+tests and ephemeral preview deployments.  Both return serialized dicts so
+the routes never touch ORM objects directly.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import load_only
+
+from app import db
+from app.cache import ChangeSignal, TodoCache
+from app.models import Todo, TodoChange
+
+
+def field_options(fields) -> list:
+    if fields is None:
+        return []
+    return [load_only(*(getattr(Todo, f) for f in fields))]
+
+
+def serialize(record: dict, fields=None) -> dict:
+    result = {}
+    for field in fields or Todo.FIELDS:
+        value = record[field]
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        result[field] = value
+    return result
+
+
+# Prune the change log on every N-th write.
+PRUNE_EVERY = 256
+# Session.info key under which atomic() collects uncommitted changes.
+DEFERRED_CHANGES = 'todo_deferred_changes'
+
+
+class SQLAlchemyTodoRepository:
+    """Todos in the configured database, with a per-worker read cache.
+
+    Every write is logged in ``todo_change`` and announced on a
+    :class:`~app.cache.ChangeSignal` shared by the workers.  Before each
+    cached read a worker checks the signal and, if anything was written
+    since it last looked, invalidates the logged ids, so a write is visible
+    to every worker's next read.  The log watermark assumes ``seq`` values
+    commit in order, which SQLite guarantees; ``make_repository`` turns the
+    cache off for other databases.
+    """
+
+    def __init__(self, cache, signal, retention: float = 300.0):
+        self.cache = cache
+        self.signal = signal
+        self.retention = retention
+        self._generation = None
+        self._seen_seq = None
+        self._synced_at = 0.0
+        self._sync_lock = threading.Lock()
+
+    def list(self, status=None, keyword=None, fields=None, limit=None) -> list:
+        query = Todo.query.options(*field_options(fields))
+
+        if status == 'active':
+            query = query.filter_by(completed=False)
+        elif status == 'completed':
+            query = query.filter_by(completed=True)
+
+        if keyword:
+            # q= is a literal substring, so neutralise LIKE wildcards.
+            escaped = (
+                keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            )
+            pattern = f'%{escaped}%'
+            query = query.filter(
+                db.or_(
+                    Todo.title.like(pattern, escape='\\'),
+                    Todo.description.like(pattern, escape='\\'),
+                )
+            )
+
+        if limit is not None:
+            query = query.order_by(Todo.id).limit(limit)
+
+        return [todo.to_dict(fields) for todo in query.all()]
+
+    def get(self, todo_id: int, fields=None):
+        """Return the serialized todo, served from the worker cache when fresh.
+
+        A cache hit costs no query; the change log is only read after some
+        worker has written since this one last synced.
+        """
+        if not self.cache.enabled:
+            todo = db.session.get(Todo, todo_id, options=field_options(fields))
+            return todo.to_dict(fields) if todo else None
+
+        self._sync_cache()
+        data = self.cache.get(todo_id)
+        if data is None:
+            if fields is not None:
+                todo = db.session.get(Todo, todo_id, options=field_options(fields))
+                return todo.to_dict(fields) if todo else None
+            generation = self._generation
+            todo = db.session.get(Todo, todo_id)
+            if not todo:
+                return None
+            data = todo.to_dict()
+            # A write committed while we were reading may already have been
+            # synced away; caching the row now could resurrect it.
+            if self.signal.value() == generation:
+                self.cache.set(todo_id, data)
+
+        if fields is None:
+            return data
+        return {field: data[field] for field in fields}
+
+    def _sync_cache(self) -> None:
+        if self.signal.value() == self._generation:
+            return
+        with self._sync_lock:
+            # Read the signal before the log so a write landing in between
+            # triggers another sync on the next read.
+            generation = self.signal.value()
+            if generation == self._generation:
+                return
+            now = time.monotonic()
+            if self._seen_seq is None or now - self._synced_at > self.retention:
+                # First sync, or rows we never saw may have been pruned.
+                self.cache.clear()
+                self._seen_seq = TodoChange.latest_seq()
+            else:
+                for seq, changed_id in TodoChange.since(self._seen_seq):
+                    self.cache.invalidate(changed_id)
+                    self._seen_seq = seq
+            self._synced_at = now
+            self._generation = generation
+
+    def create(self, title: str, description: str) -> dict:
+        todo = Todo(title=title, description=description)
+        db.session.add(todo)
+        db.session.flush()
+        self._commit_change(todo.id)
+        return todo.to_dict()
+
+    def update(self, todo_id: int, changes: dict):
+        todo = db.session.get(Todo, todo_id)
+        if not todo:
+            return None
+
+        for field, value in changes.items():
+            setattr(todo, field, value)
+
+        self._commit_change(todo_id)
+        return todo.to_dict()
+
+    def toggle(self, todo_id: int):
+        todo = db.session.get(Todo, todo_id)
+        if not todo:
+            return None
+
+        todo.completed = not todo.completed
+        self._commit_change(todo_id)
+        return todo.to_dict()
+
+    def delete(self, todo_id: int) -> bool:
+        todo = db.session.get(Todo, todo_id)
+        if not todo:
+            return False
+
+        db.session.delete(todo)
+        self._commit_change(todo_id)
+        return True
+
+    @contextmanager
+    def atomic(self):
+        """Commit the block's todo writes in one transaction on exit.
+
+        Callers can add their own rows to the same commit, e.g. the stored
+        response of an idempotent request; an exception rolls it all back.
+        """
+        changes = db.session.info[DEFERRED_CHANGES] = []
+        try:
+            yield
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.info.pop(DEFERRED_CHANGES, None)
+        if changes:
+            self._publish(changes)
+
+    def _commit_change(self, todo_id: int) -> None:
+        """Log the write for other workers and commit it with the change."""
+        change = TodoChange(todo_id=todo_id)
+        db.session.add(change)
+        db.session.flush()
+        deferred = db.session.info.get(DEFERRED_CHANGES)
+        if deferred is not None:
+            deferred.append((change.seq, todo_id))
+            return
+        seq = change.seq
+        db.session.commit()
+        self._publish([(seq, todo_id)])
+
+    def _publish(self, changes) -> None:
+        """Announce committed changes to every worker's cache."""
+        self.signal.bump()
+        for _, todo_id in changes:
+            self.cache.invalidate(todo_id)
+
+        if any(seq % PRUNE_EVERY == 0 for seq, _ in changes):
+            # Keep twice the retention so a worker that syncs within
+            # ``retention`` never misses a row.
+            cutoff = datetime.utcnow() - timedelta(seconds=2 * self.retention)
+            TodoChange.prune(cutoff)
+            db.session.commit()
+
+
+_ASCII_LOWER = str.maketrans(
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'
+)
+
+
+def _fold(text: str) -> str:
+    # SQLite's LIKE only folds ASCII letters; match it exactly.
+    return text.translate(_ASCII_LOWER)
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class MemoryTodoRepository:
+    """Process-local todo store.
+
+    ``_ids`` keeps ids sorted so listings come back in insertion order,
+    ``_completed`` is the status index, and ``_grams`` is an inverted index
+    from lower-cased trigrams of title/description to ids, which narrows
+    ``q=`` searches before the exact substring check.
+    """
+
+    def __init__(self):
+        self._records = {}
+        self._ids = []
+        self._completed = set()
+        self._grams = {}
+        self._next_id = 1
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def atomic(self):
+        """Commit the caller's database rows on exit.
+
+        Memory writes apply immediately and are not rolled back with it;
+        a process that dies mid-request takes the whole store with it, so
+        no committed mutation is left for a retry to repeat.
+        """
+        try:
+            yield
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            raise
+
+    def load(self, rows) -> None:
+        """Insert pre-built row dicts (e.g. from a fixture generator)."""
+        with self._lock:
+            for row in rows:
+                record = {field: row.get(field) for field in Todo.FIELDS}
+                record['id'] = record['id'] or self._next_id
+                self._insert(record)
+
+    def list(self, status=None, keyword=None, fields=None, limit=None) -> list:
+        with self._lock:
+            if keyword:
+                ids = self._search(_fold(keyword))
+            else:
+                ids = self._ids
+
+            if status == 'active':
+                ids = [i for i in ids if i not in self._completed]
+            elif status == 'completed':
+                if keyword:
+                    ids = [i for i in ids if i in self._completed]
+                else:
+                    ids = sorted(self._completed)
+
+            if limit is not None:
+                ids = ids[:limit]
+            return [serialize(self._records[i], fields) for i in ids]
+
+    def get(self, todo_id: int, fields=None):
+        with self._lock:
+            record = self._records.get(todo_id)
+            return serialize(record, fields) if record else None
+
+    def create(self, title: str, description: str) -> dict:
+        now = datetime.utcnow()
+        # Coerce before _insert: a value _index cannot fold would leave a
+        # half-inserted record that breaks every later search.
+        title = self._coerce('title', title)
+        description = self._coerce('description', description)
+        with self._lock:
+            record = {
+                'id': self._next_id,
+                'title': title,
+                'description': description,
+                'completed': False,
+                'created_at': now,
+                'updated_at': now,
+            }
+            self._insert(record)
+            return serialize(record)
+
+    def update(self, todo_id: int, changes: dict):
+        with self._lock:
+            record = self._records.get(todo_id)
+            if record is None:
+                return None
+
+            # Coerce everything before touching the indexes so a bad value
+            # cannot leave the record half-updated and unsearchable.
+            values = {
+                field: self._coerce(field, value)
+                for field, value in changes.items()
+            }
+
+            self._unindex(record)
+            record.update(values)
+            record['updated_at'] = datetime.utcnow()
+            self._index(record)
+            return serialize(record)
+
+    def toggle(self, todo_id: int):
+        with self._lock:
+            record = self._records.get(todo_id)
+            if record is None:
+                return None
+            return self.update(todo_id, {'completed': not record['completed']})
+
+    def delete(self, todo_id: int) -> bool:
+        with self._lock:
+            record = self._records.pop(todo_id, None)
+            if record is None:
+                return False
+
+            self._unindex(record)
+            del self._ids[bisect.bisect_left(self._ids, todo_id)]
+            return True
+
+    @staticmethod
+    def _coerce(field: str, value):
+        """Store values the way SQLite's column affinity would."""
+        if field == 'completed':
+            return bool(value)
+        if value is None:
+            if field == 'title':
+                raise ValueError('title must not be null')
+            return None
+        return str(value)
+
+    def _insert(self, record: dict) -> None:
+        todo_id = record['id']
+        self._records[todo_id] = record
+        bisect.insort(self._ids, todo_id)
+        self._next_id = max(self._next_id, todo_id + 1)
+        self._index(record)
+
+    def _text(self, record: dict) -> tuple:
+        return _fold(record['title'] or ''), _fold(record['description'] or '')
+
+    def _index(self, record: dict) -> None:
+        todo_id = record['id']
+        if record['completed']:
+            self._completed.add(todo_id)
+        for text in self._text(record):
+            for gram in _trigrams(text):
+                self._grams.setdefault(gram, set()).add(todo_id)
+
+    def _unindex(self, record: dict) -> None:
+        todo_id = record['id']
+        self._completed.discard(todo_id)
+        for text in self._text(record):
+            for gram in _trigrams(text):
+                postings = self._grams.get(gram)
+                if postings is not None:
+                    postings.discard(todo_id)
+                    if not postings:
+                        del self._grams[gram]
+
+    def _search(self, keyword: str) -> list:
+        grams = _trigrams(keyword)
+        if grams:
+            postings = sorted(
+                (self._grams.get(gram, set()) for gram in grams), key=len
+            )
+            candidates = set.intersection(*postings) if postings[0] else set()
+            ids = sorted(candidates)
+        else:
+            ids = self._ids
+
+        return [
+            i for i in ids
+            if any(keyword in text for text in self._text(self._records[i]))
+        ]
+
+
+def make_repository(app):
+    storage = app.config['TODO_STORAGE']
+    if storage == 'sqlalchemy':
+        with app.app_context():
+            url = db.engine.url
+        cache = app.extensions['todo_cache']
+        if url.get_backend_name() != 'sqlite' and cache.enabled:
+            app.logger.warning(
+                'The todo cache needs SQLite to order change-log commits; '
+                'disabling it for %s', url.get_backend_name(),
+            )
+            cache = app.extensions['todo_cache'] = TodoCache(maxsize=0)
+        # Workers sharing a database file share its signal, like SQLite's
+        # own -wal and -shm files.
+        on_disk = cache.enabled and url.database not in (None, '', ':memory:')
+        path = f'{url.database}-cache' if on_disk else None
+        return SQLAlchemyTodoRepository(
+            cache,
+            ChangeSignal(path),
+            retention=app.config['TODO_CACHE_LOG_RETENTION'],
+        )
+    if storage == 'memory':
+        return MemoryTodoRepository()
+    raise ValueError(f'Unknown TODO_STORAGE: {storage}')
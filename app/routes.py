@@ -1,99 +1,225 @@
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, current_app, request, jsonify, render_template
+from werkzeug.test import EnvironBuilder
+
 from app import db
+from app.idempotency import HEADER as IDEMPOTENCY_HEADER, idempotent
 from app.models import Todo
 
 todo_bp = Blueprint('todo', __name__)
 
 
+def parse_fields():
+    """Parse the ``fields`` query parameter into a tuple of column names.
+
+    Returns ``(fields, error)``; ``fields`` is ``None`` when the parameter
+    is absent so callers fall back to the full representation.
+    """
+    raw = request.args.get('fields')
+    if raw is None:
+        return None, None
+
+    requested = {name.strip() for name in raw.split(',') if name.strip()}
+    if not requested:
+        return None, 'fields must not be empty'
+
+    unknown = sorted(requested - set(Todo.FIELDS))
+    if unknown:
+        return None, f'Unknown field: {", ".join(unknown)}'
+
+    return tuple(f for f in Todo.FIELDS if f in requested), None
+
+
+FIELD_TYPES = {'title': str, 'description': str, 'completed': bool}
+
+
+def validate_todo(data: dict):
+    """Return an error for a payload field of the wrong JSON type.
+
+    Both storage backends would otherwise coerce such values differently.
+    """
+    for field, expected in FIELD_TYPES.items():
+        if field not in data:
+            continue
+        value = data[field]
+        if field == 'description' and value is None:
+            continue
+        if not isinstance(value, expected):
+            kind = 'a boolean' if expected is bool else 'a string'
+            return f'{field} must be {kind}'
+    return None
+
+
+def todo_repository():
+    return current_app.extensions['todo_repository']
+
+
+def todo_cache():
+    return current_app.extensions['todo_cache']
+
+
 @todo_bp.route('/')
 def index():
-    return render_template('index.html')
+    # Embed the first page so the list paints without an API round trip;
+    # the client only fetches when the page is incomplete.
+    limit = current_app.config['INDEX_PRELOAD_LIMIT']
+    todos = todo_repository().list(limit=limit + 1)
+    initial = {'todos': todos[:limit], 'complete': len(todos) <= limit}
+    return render_template('index.html', initial=initial)
 
 
 @todo_bp.route('/api/todos', methods=['GET'])
 def get_todos():
-    query = Todo.query
-    status = request.args.get('status')
-    keyword = request.args.get('q')
-
-    if status == 'active':
-        query = query.filter_by(completed=False)
-    elif status == 'completed':
-        query = query.filter_by(completed=True)
-
-    if keyword:
-        pattern = f'%{keyword}%'
-        query = query.filter(
-            db.or_(
-                Todo.title.like(pattern),
-                Todo.description.like(pattern),
-            )
-        )
+    fields, error = parse_fields()
+    if error:
+        return jsonify({'error': error}), 400
 
-    todos = query.all()
-    return jsonify({'todos': [todo.to_dict() for todo in todos]}), 200
+    todos = todo_repository().list(
+        status=request.args.get('status'),
+        keyword=request.args.get('q'),
+        fields=fields,
+    )
+    return jsonify({'todos': todos}), 200
 
 
 @todo_bp.route('/api/todos', methods=['POST'])
+@idempotent
 def create_todo():
     data = request.get_json()
-    title = data.get('title', '').strip() if data else ''
+    if not isinstance(data, dict):
+        data = {}
+    error = validate_todo(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    title = data.get('title', '').strip()
 
     if not title:
         return jsonify({'error': 'Title is required'}), 400
 
-    description = data.get('description', '') if data else ''
-    todo = Todo(title=title, description=description)
-    db.session.add(todo)
-    db.session.commit()
+    description = data.get('description', '')
+    todo = todo_repository().create(title, description)
 
-    return jsonify({'todo': todo.to_dict()}), 201
+    return jsonify({'todo': todo}), 201
 
 
 @todo_bp.route('/api/todos/<int:todo_id>', methods=['GET'])
 def get_todo(todo_id: int):
-    todo = db.session.get(Todo, todo_id)
-    if not todo:
+    fields, error = parse_fields()
+    if error:
+        return jsonify({'error': error}), 400
+
+    todo = todo_repository().get(todo_id, fields)
+    if todo is None:
         return jsonify({'error': 'Todo not found'}), 404
 
-    return jsonify({'todo': todo.to_dict()}), 200
+    return jsonify({'todo': todo}), 200
 
 
 @todo_bp.route('/api/todos/<int:todo_id>', methods=['PUT'])
+@idempotent
 def update_todo(todo_id: int):
-    todo = db.session.get(Todo, todo_id)
-    if not todo:
-        return jsonify({'error': 'Todo not found'}), 404
-
     data = request.get_json()
-    if 'title' in data:
-        todo.title = data['title']
-    if 'description' in data:
-        todo.description = data['description']
-    if 'completed' in data:
-        todo.completed = data['completed']
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    error = validate_todo(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    changes = {
+        field: data[field]
+        for field in ('title', 'description', 'completed')
+        if field in data
+    }
+
+    todo = todo_repository().update(todo_id, changes)
+    if todo is None:
+        return jsonify({'error': 'Todo not found'}), 404
 
-    db.session.commit()
-    return jsonify({'todo': todo.to_dict()}), 200
+    return jsonify({'todo': todo}), 200
 
 
 @todo_bp.route('/api/todos/<int:todo_id>', methods=['DELETE'])
+@idempotent
 def delete_todo(todo_id: int):
-    todo = db.session.get(Todo, todo_id)
-    if not todo:
+    if not todo_repository().delete(todo_id):
         return jsonify({'error': 'Todo not found'}), 404
 
-    db.session.delete(todo)
-    db.session.commit()
     return jsonify({'message': 'Todo deleted'}), 200
 
 
 @todo_bp.route('/api/todos/<int:todo_id>/toggle', methods=['PATCH'])
+@idempotent
 def toggle_todo(todo_id: int):
-    todo = db.session.get(Todo, todo_id)
-    if not todo:
+    todo = todo_repository().toggle(todo_id)
+    if todo is None:
         return jsonify({'error': 'Todo not found'}), 404
 
-    todo.completed = not todo.completed
-    db.session.commit()
-    return jsonify({'todo': todo.to_dict()}), 200
+    return jsonify({'todo': todo}), 200
+
+
+@todo_bp.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({'cache': todo_cache().stats()}), 200
+
+
+BATCH_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+def validate_batch(data):
+    items = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return 'requests must be a non-empty list'
+
+    limit = current_app.config['BATCH_MAX_REQUESTS']
+    if len(items) > limit:
+        return f'At most {limit} requests per batch'
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            return f'requests[{index}] must be an object'
+        if item.get('method') not in BATCH_METHODS:
+            return f'requests[{index}].method must be one of {", ".join(BATCH_METHODS)}'
+        path = item.get('path')
+        if not isinstance(path, str) or not path.startswith('/api/todos'):
+            return f'requests[{index}].path must start with /api/todos'
+    return None
+
+
+def dispatch_batch_item(item) -> dict:
+    """Run one batched mutation through the normal routing and hooks.
+
+    Each item gets its own application context, so it has its own session
+    and ``g`` and commits independently of its neighbours.
+    """
+    headers = {}
+    if item.get('idempotency_key') is not None:
+        headers[IDEMPOTENCY_HEADER] = str(item['idempotency_key'])
+    builder = EnvironBuilder(
+        path=item['path'], method=item['method'],
+        json=item.get('body'), headers=headers,
+    )
+
+    with current_app.app_context(), current_app.request_context(builder.get_environ()):
+        try:
+            response = current_app.full_dispatch_request()
+        except Exception:
+            current_app.logger.exception('Batched request failed')
+            db.session.rollback()
+            return {'status': 500, 'body': {'error': 'Internal server error'}}
+
+        return {
+            'status': response.status_code,
+            'body': response.get_json(silent=True),
+            'replayed': response.headers.get('Idempotent-Replayed') == 'true',
+        }
+
+
+@todo_bp.route('/api/batch', methods=['POST'])
+def batch():
+    data = request.get_json()
+    error = validate_batch(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    responses = [dispatch_batch_item(item) for item in data['requests']]
+    return jsonify({'responses': responses}), 200
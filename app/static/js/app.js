@@ -10,8 +10,12 @@ document.addEventListener('DOMContentLoaded', function () {
     let currentFilter = 'all';
     let searchTimeout = null;
 
-    // Load todos on page load
-    loadTodos();
+    // Render the todos embedded by the server; fetch only if truncated
+    var initial = JSON.parse(document.getElementById('initial-todos').textContent);
+    renderTodos(initial.todos);
+    if (!initial.complete) {
+        loadTodos();
+    }
 
     // Add todo form submit
     todoForm.addEventListener('submit', function (e) {
@@ -0,0 +1,69 @@
+"""Compare full vs. projected reads of ``GET /api/todos`` on wide rows.
+
+Usage: python -m benchmarks.bench_fields [rows] [repeat]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from app import create_app, db
+from app.models import Todo
+from config import TestingConfig
+
+
+def make_config(path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    return BenchConfig
+
+
+def seed(rows: int):
+    now = datetime.utcnow()
+    db.session.execute(
+        db.insert(Todo),
+        [
+            {
+                'title': f'Todo {i}',
+                'description': 'x' * 500,
+                'completed': i % 2 == 0,
+                'created_at': now,
+                'updated_at': now,
+            }
+            for i in range(rows)
+        ],
+    )
+    db.session.commit()
+
+
+def measure(client, url: str, repeat: int):
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        best = min(best, time.perf_counter() - start)
+        size = len(response.data)
+    return best, size
+
+
+def main(rows: int = 5000, repeat: int = 5):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(make_config(os.path.join(tmp, 'bench.db')))
+        with app.app_context():
+            seed(rows)
+            client = app.test_client()
+            cases = [
+                ('full', '/api/todos'),
+                ('projected', '/api/todos?fields=id,title,completed'),
+            ]
+            print(f'{rows} rows, best of {repeat}')
+            for label, url in cases:
+                seconds, size = measure(client, url, repeat)
+                print(f'{label:>10}: {seconds * 1000:8.1f} ms  {size:>10} bytes')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
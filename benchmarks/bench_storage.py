@@ -0,0 +1,72 @@
+"""Compare the SQLAlchemy and in-memory todo storage backends.
+
+Usage: python -m benchmarks.bench_storage [rows] [repeat]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from app import create_app, db
+from config import TestingConfig
+from datagen import bulk_load, generate_rows
+
+CASES = [
+    ('list', 'GET', '/api/todos'),
+    ('active', 'GET', '/api/todos?status=active'),
+    ('search common', 'GET', '/api/todos?q=review'),
+    ('search rare', 'GET', '/api/todos?q=passport'),
+    ('get', 'GET', '/api/todos/{mid}'),
+    ('toggle', 'PATCH', '/api/todos/{mid}/toggle'),
+]
+
+
+def make_config(storage, path):
+    class BenchConfig(TestingConfig):
+        TODO_STORAGE = storage
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    return BenchConfig
+
+
+def seed(app, rows: int):
+    if app.config['TODO_STORAGE'] == 'memory':
+        app.extensions['todo_repository'].load(generate_rows(rows))
+    else:
+        bulk_load(db.engine, rows)
+
+
+def measure(client, method: str, url: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        client.open(url, method=method)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(rows: int = 20000, repeat: int = 5):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for storage in ('sqlalchemy', 'memory'):
+            path = os.path.join(tmp, f'{storage}.db')
+            app = create_app(make_config(storage, path))
+            with app.app_context():
+                seed(app, rows)
+                client = app.test_client()
+                for label, method, url in CASES:
+                    url = url.format(mid=rows // 2)
+                    results[label, storage] = measure(client, method, url, repeat)
+                db.engine.dispose()
+
+    print(f'{rows} rows, best of {repeat} (ms)')
+    print(f"{'case':>14} {'sqlalchemy':>12} {'memory':>12}")
+    for label, _, _ in CASES:
+        print(
+            f"{label:>14} {results[label, 'sqlalchemy'] * 1000:12.2f} "
+            f"{results[label, 'memory'] * 1000:12.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -4,6 +4,38 @@ import os
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 'sqlalchemy' persists todos; 'memory' keeps them in the worker process.
+    TODO_STORAGE = os.environ.get('TODO_STORAGE', 'sqlalchemy')
+    # Per-worker cache of serialized todos; a size of 0 disables it.  Workers
+    # on one host invalidate each other through a file beside the SQLite
+    # database; other databases run without the cache.
+    TODO_CACHE_SIZE = int(os.environ.get('TODO_CACHE_SIZE', 1024))
+    TODO_CACHE_TTL = float(os.environ.get('TODO_CACHE_TTL', 60))
+    TODO_CACHE_LOG_RETENTION = 300
+    # Todos embedded in the index page for first paint.
+    INDEX_PRELOAD_LIMIT = 100
+    # Stored responses for retried mutations carrying an Idempotency-Key.
+    IDEMPOTENCY_TTL = 24 * 60 * 60
+    # An unfinished reservation may be retried after this many seconds; keep
+    # it above the gunicorn worker timeout (30 s) so live requests keep it.
+    IDEMPOTENCY_LOCK_SECONDS = 60
+    # Mutations accepted by one POST /api/batch call.
+    BATCH_MAX_REQUESTS = 100
+    # Background jobs run by `flask jobs worker`.
+    JOB_CONCURRENCY = int(os.environ.get('JOB_CONCURRENCY', 2))
+    JOB_MAX_ATTEMPTS = 3
+    JOB_RETRY_BACKOFF = 5
+    JOB_LEASE_SECONDS = 300
+    JOB_POLL_INTERVAL = 1.0
+    # Per-request profiling; no hooks are installed unless enabled.
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+    PROFILE_HEADER = 'X-Profile'
+    # The header must carry this token; empty disables header triggering.
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_SAMPLE_INTERVAL = 0.001
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', '')
+    PROFILE_MAX_CAPTURES = int(os.environ.get('PROFILE_MAX_CAPTURES', 200))
 
 
 class DevelopmentConfig(Config):
@@ -13,9 +45,28 @@ class DevelopmentConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+class EphemeralConfig(Config):
+    """Preview deployments: todos live in memory and vanish on restart.
+
+    Each process has its own store, so serve this with a single worker
+    (``run.sh preview``); extra gunicorn workers would each see different data.
+    """
+    TODO_STORAGE = 'memory'
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
 
 
 class ProductionConfig(Config):
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///prod.db')
+
+
+# Selected by the APP_CONFIG environment variable in wsgi.py.
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'ephemeral': EphemeralConfig,
+    'production': ProductionConfig,
+}
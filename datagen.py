@@ -0,0 +1,142 @@
+"""Deterministic synthetic ``Todo`` data for tests and benchmarks.
+
+Rows are produced from a seeded RNG with Zipf-distributed vocabulary so
+that keyword searches hit a realistic mix of common and rare words.  They
+are bulk-loaded through SQLAlchemy core inserts into a standalone SQLite
+snapshot that is cached and copied for each test.
+"""
+import hashlib
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app import db
+from app.models import Todo
+
+# Bump when the generated data changes so cached snapshots are rebuilt.
+GENERATOR_VERSION = 1
+
+EPOCH = datetime(2024, 1, 1)
+
+VOCABULARY = (
+    'review report update meeting email call team project plan draft '
+    'fix bug deploy release test write read check send order book pay '
+    'bill schedule doctor dentist groceries milk eggs bread coffee lunch '
+    'dinner clean kitchen laundry garden car repair insurance tax budget '
+    'invoice client proposal slides design sprint backlog ticket issue '
+    'refactor migrate database server backup monitor alert oncall docs '
+    'onboarding interview hire feedback quarterly goals roadmap launch '
+    'marketing campaign social post blog newsletter podcast video edit '
+    'photo album birthday gift party travel flight hotel passport visa '
+    'packing gym run yoga swim bike stretch meditate journal family mom '
+    'dad kids school homework pickup recital practice piano guitar lesson '
+    'library return renew subscription cancel upgrade phone laptop charger '
+    'printer ink paper stamps mail package delivery pharmacy vitamins '
+    'recipe bake cake cookies soup salad vegetables fruit apples bananas '
+    'oranges water plants paint fence roof gutter plumber electrician '
+    'landlord lease rent mortgage bank transfer savings account password '
+    'security audit compliance policy contract legal signature notary '
+    'volunteer donate charity church neighbor friend wedding anniversary '
+    'conference workshop course certificate exam study chapter notes '
+    'research analysis metrics dashboard spreadsheet summary follow up'
+).split()
+
+# Zipf-like weights: the n-th word is roughly 1/n as frequent as the first.
+_CUM_WEIGHTS = []
+_total = 0.0
+for _rank in range(1, len(VOCABULARY) + 1):
+    _total += 1.0 / _rank ** 1.1
+    _CUM_WEIGHTS.append(_total)
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return ' '.join(rng.choices(VOCABULARY, cum_weights=_CUM_WEIGHTS, k=count))
+
+
+def generate_rows(count: int, seed: int = 0, start_id: int = 1):
+    """Yield ``count`` row dicts ready for ``insert(Todo)``."""
+    rng = random.Random(seed)
+    for todo_id in range(start_id, start_id + count):
+        title = _words(rng, rng.randint(2, 8)).capitalize()[:200]
+        if rng.random() < 0.3:
+            description = ''
+        else:
+            description = _words(rng, int(rng.expovariate(1 / 15)) + 1)[:500]
+        created_at = EPOCH + timedelta(seconds=rng.randrange(365 * 86400))
+        updated_at = created_at + timedelta(seconds=rng.randrange(30 * 86400))
+        yield {
+            'id': todo_id,
+            'title': title,
+            'description': description,
+            'completed': rng.random() < 0.4,
+            'created_at': created_at,
+            'updated_at': updated_at,
+        }
+
+
+def bulk_load(engine, count: int, seed: int = 0, chunk_size: int = 50_000) -> dict:
+    """Insert ``count`` generated rows and return status counts."""
+    stats = {'total': count, 'active': 0, 'completed': 0}
+    rows = generate_rows(count, seed)
+    with engine.connect() as conn:
+        conn.exec_driver_sql('PRAGMA journal_mode=OFF')
+        conn.exec_driver_sql('PRAGMA synchronous=OFF')
+        while True:
+            chunk = [row for _, row in zip(range(chunk_size), rows)]
+            if not chunk:
+                break
+            for row in chunk:
+                stats['completed' if row['completed'] else 'active'] += 1
+            conn.execute(db.insert(Todo), chunk)
+            conn.commit()
+    return stats
+
+
+def build_snapshot(path: str, count: int, seed: int = 0) -> dict:
+    """Write a fresh SQLite database with ``count`` todos to ``path``."""
+    tmp_path = f'{path}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    engine = create_engine(f'sqlite:///{tmp_path}')
+    try:
+        db.metadata.create_all(engine)
+        stats = bulk_load(engine, count, seed)
+    finally:
+        engine.dispose()
+    os.replace(tmp_path, path)
+    return stats
+
+
+def schema_hash() -> str:
+    """Short digest of the DDL ``create_all`` would emit for the models.
+
+    ``create_all`` never alters existing tables, so a snapshot built
+    before a model change must not be reused after it.
+    """
+    dialect = sqlite.dialect()
+    digest = hashlib.sha256()
+    for table in db.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    return digest.hexdigest()[:12]
+
+
+def load_snapshot(cache_dir: str, count: int, seed: int = 0):
+    """Return ``(path, stats)`` for a cached snapshot, building it if needed."""
+    name = f'todos-v{GENERATOR_VERSION}-{schema_hash()}-{count}-{seed}'
+    path = os.path.join(cache_dir, f'{name}.db')
+    stats_path = os.path.join(cache_dir, f'{name}.json')
+    if os.path.exists(path) and os.path.exists(stats_path):
+        with open(stats_path) as f:
+            return path, json.load(f)
+
+    stats = build_snapshot(path, count, seed)
+    with open(stats_path, 'w') as f:
+        json.dump(stats, f)
+    return path, stats
@@ -3,6 +3,12 @@
 # Development mode
 if [ "$1" = "dev" ]; then
     python wsgi.py
+# Background job worker
+elif [ "$1" = "worker" ]; then
+    flask --app wsgi jobs worker
+# Preview mode: in-memory storage, so one worker process only
+elif [ "$1" = "preview" ]; then
+    APP_CONFIG=ephemeral gunicorn --bind 0.0.0.0:5000 --workers 1 --threads 4 wsgi:app
 # Production mode
 else
     gunicorn --bind 0.0.0.0:5000 --workers 4 wsgi:app
@@ -1,16 +1,69 @@
+import shutil
+
 import pytest
 
 from app import create_app, db as _db
 from config import TestingConfig
 
+DEFAULT_LARGE_ROWS = 1_000_000
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--large-dataset', type=int, nargs='?', const=DEFAULT_LARGE_ROWS,
+        default=None, metavar='ROWS',
+        help='Run large_dataset tests against ROWS synthetic todos '
+             f'(default {DEFAULT_LARGE_ROWS}).',
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'large_dataset: runs against a bulk-loaded synthetic dataset; '
+        'enabled with --large-dataset',
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--large-dataset') is not None:
+        return
+    skip = pytest.mark.skip(reason='needs --large-dataset')
+    for item in items:
+        if 'large_dataset' in item.keywords:
+            item.add_marker(skip)
+
 
 @pytest.fixture
-def app():
-    app = create_app(TestingConfig)
+def storage():
+    """Todo storage backend; override with params to run on several."""
+    return 'sqlalchemy'
+
+
+@pytest.fixture
+def database_uri():
+    """In-memory SQLite; override with a file for multi-process tests."""
+    return TestingConfig.SQLALCHEMY_DATABASE_URI
+
+
+@pytest.fixture
+def app_config(storage, database_uri):
+    class StorageConfig(TestingConfig):
+        TODO_STORAGE = storage
+        SQLALCHEMY_DATABASE_URI = database_uri
+
+    return StorageConfig
+
+
+@pytest.fixture
+def app(app_config):
+    # create_app builds the schema; the in-memory database is discarded
+    # with its engine, so there is nothing to drop.
+    app = create_app(app_config)
     with app.app_context():
-        _db.create_all()
         yield app
-        _db.drop_all()
+        _db.session.remove()
+        _db.engine.dispose()
 
 
 @pytest.fixture
@@ -22,3 +75,34 @@ def client(app):
 def db_session(app):
     with app.app_context():
         yield _db.session
+
+
+@pytest.fixture(scope='session')
+def large_dataset(pytestconfig):
+    """``(snapshot_path, stats)`` for the cached synthetic dataset."""
+    from datagen import load_snapshot
+
+    rows = pytestconfig.getoption('--large-dataset')
+    cache_dir = str(pytestconfig.cache.mkdir('todo-datasets'))
+    return load_snapshot(cache_dir, rows)
+
+
+@pytest.fixture
+def large_app(large_dataset, tmp_path):
+    snapshot, _ = large_dataset
+    path = tmp_path / 'large.db'
+    shutil.copyfile(snapshot, path)
+
+    class LargeDatasetConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    app = create_app(LargeDatasetConfig)
+    with app.app_context():
+        yield app
+        _db.session.remove()
+        _db.engine.dispose()
+
+
+@pytest.fixture
+def large_client(large_app):
+    return large_app.test_client()
@@ -1,5 +1,12 @@
 import json
 
+import pytest
+
+
+@pytest.fixture(params=['sqlalchemy', 'memory'])
+def storage(request):
+    return request.param
+
 
 def create_todo(client, title='Test todo', description=''):
     """Helper to create a todo via the API."""
@@ -60,6 +67,23 @@ class TestCreateTodo:
         data = response.get_json()
         assert data['error'] == 'Title is required'
 
+    @pytest.mark.parametrize('payload, error', [
+        ({'title': 5}, 'title must be a string'),
+        ({'title': 'x', 'description': 5}, 'description must be a string'),
+        ({'title': 'x', 'completed': 'false'}, 'completed must be a boolean'),
+    ])
+    def test_create_with_wrong_type_returns_400(self, client, payload, error):
+        response = client.post(
+            '/api/todos',
+            data=json.dumps(payload),
+            content_type='application/json',
+        )
+        assert response.status_code == 400
+        assert response.get_json()['error'] == error
+
+        assert client.get('/api/todos').get_json()['todos'] == []
+        assert client.get('/api/todos?q=x').get_json()['todos'] == []
+
 
 class TestGetTodos:
     def test_empty_list(self, client):
@@ -138,6 +162,18 @@ class TestGetTodos:
         assert data['todos'][0]['title'] == 'Buy groceries'
         assert data['todos'][0]['completed'] is False
 
+    @pytest.mark.parametrize('keyword, expected', [
+        ('a_b', ['a_b']),
+        ('50%', ['50% off']),
+        ('\\', ['back\\slash']),
+    ])
+    def test_search_treats_wildcards_literally(self, client, keyword, expected):
+        for title in ('a_b', 'axb', '50% off', '500 items', 'back\\slash'):
+            create_todo(client, title=title)
+
+        response = client.get('/api/todos', query_string={'q': keyword})
+        assert [t['title'] for t in response.get_json()['todos']] == expected
+
     def test_search_no_results(self, client):
         create_todo(client, title='Buy groceries')
 
@@ -165,6 +201,78 @@ class TestGetSingleTodo:
         assert data['error'] == 'Todo not found'
 
 
+class TestFieldProjection:
+    def test_list_returns_only_requested_fields(self, client):
+        create_todo(client, title='Buy groceries', description='Milk and eggs')
+
+        response = client.get('/api/todos?fields=id,title,completed')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['todos'] == [
+            {'id': 1, 'title': 'Buy groceries', 'completed': False}
+        ]
+
+    def test_detail_returns_only_requested_fields(self, client):
+        resp = create_todo(client, title='My todo', description='Details')
+        todo_id = resp.get_json()['todo']['id']
+
+        response = client.get(f'/api/todos/{todo_id}?fields=title')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['todo'] == {'title': 'My todo'}
+
+    def test_fields_combined_with_filter(self, client):
+        create_todo(client, title='Active todo')
+        resp = create_todo(client, title='Completed todo')
+        todo_id = resp.get_json()['todo']['id']
+        client.patch(f'/api/todos/{todo_id}/toggle')
+
+        response = client.get('/api/todos?status=completed&fields=id,completed')
+        data = response.get_json()
+        assert data['todos'] == [{'id': todo_id, 'completed': True}]
+
+    def test_select_is_narrowed(self, app, client, storage):
+        if storage != 'sqlalchemy':
+            pytest.skip('only the SQLAlchemy backend issues SELECTs')
+        from sqlalchemy import event
+        from app import db
+
+        create_todo(client, title='Wide row', description='x' * 500)
+        statements = []
+
+        def capture(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            client.get('/api/todos?fields=id,title')
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+
+        select = next(s for s in statements if s.startswith('SELECT'))
+        assert 'todo.title' in select
+        assert 'todo.description' not in select
+        assert 'todo.created_at' not in select
+
+    def test_unknown_field_returns_400(self, client):
+        response = client.get('/api/todos?fields=id,secret')
+        assert response.status_code == 400
+        data = response.get_json()
+        assert data['error'] == 'Unknown field: secret'
+
+    def test_unknown_field_on_detail_returns_400(self, client):
+        resp = create_todo(client, title='My todo')
+        todo_id = resp.get_json()['todo']['id']
+
+        response = client.get(f'/api/todos/{todo_id}?fields=bogus')
+        assert response.status_code == 400
+
+    def test_empty_fields_returns_400(self, client):
+        response = client.get('/api/todos?fields=')
+        assert response.status_code == 400
+
+
 class TestUpdateTodo:
     def test_update_title(self, client):
         resp = create_todo(client, title='Old title')
@@ -205,6 +313,30 @@ class TestUpdateTodo:
         data = response.get_json()
         assert data['todo']['completed'] is True
 
+    @pytest.mark.parametrize('payload, error', [
+        ({'title': 5}, 'title must be a string'),
+        ({'title': None}, 'title must be a string'),
+        ({'description': 5}, 'description must be a string'),
+        ({'completed': 'false'}, 'completed must be a boolean'),
+    ])
+    def test_update_with_wrong_type_returns_400(self, client, payload, error):
+        resp = create_todo(client, title='hello')
+        todo_id = resp.get_json()['todo']['id']
+
+        response = client.put(
+            f'/api/todos/{todo_id}',
+            data=json.dumps(payload),
+            content_type='application/json',
+        )
+        assert response.status_code == 400
+        assert response.get_json()['error'] == error
+
+        todo = client.get(f'/api/todos/{todo_id}').get_json()['todo']
+        assert todo['title'] == 'hello'
+        assert todo['completed'] is False
+        response = client.get('/api/todos?q=hel')
+        assert [t['id'] for t in response.get_json()['todos']] == [todo_id]
+
     def test_update_nonexistent_todo_returns_404(self, client):
         response = client.put(
             '/api/todos/999',
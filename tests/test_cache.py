@@ -0,0 +1,195 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.cache import ChangeSignal, TodoCache
+from app.models import TodoChange
+from app.repository import PRUNE_EVERY
+
+
+@pytest.fixture
+def database_uri(tmp_path):
+    # Several apps stand in for gunicorn workers, so they share a file.
+    return f'sqlite:///{tmp_path / "shared.db"}'
+
+
+def count_statements(app, call):
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        call()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    return statements
+
+
+def create_todo(client, title='Test todo'):
+    return client.post(
+        '/api/todos',
+        data=json.dumps({'title': title}),
+        content_type='application/json',
+    )
+
+
+class TestTodoCache:
+    def test_get_miss_then_hit(self):
+        cache = TodoCache(maxsize=2)
+        assert cache.get(1) is None
+        cache.set(1, {'id': 1})
+        assert cache.get(1) == {'id': 1}
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_invalidate_removes_entry(self):
+        cache = TodoCache()
+        cache.set(1, {'id': 1})
+        cache.invalidate(1)
+        assert cache.get(1) is None
+        assert cache.stats()['size'] == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = TodoCache(maxsize=2)
+        cache.set(1, {'id': 1})
+        cache.set(2, {'id': 2})
+        cache.get(1)
+        cache.set(3, {'id': 3})
+        assert cache.get(2) is None
+        assert cache.get(1) == {'id': 1}
+
+    def test_expired_entry_is_a_miss(self):
+        cache = TodoCache(ttl=0)
+        cache.set(1, {'id': 1})
+        assert cache.get(1) is None
+
+    def test_zero_size_disables_cache(self):
+        cache = TodoCache(maxsize=0)
+        cache.set(1, {'id': 1})
+        assert not cache.enabled
+        assert cache.get(1) is None
+
+
+class TestCachedReads:
+    def test_repeated_get_hits_cache(self, client):
+        todo_id = create_todo(client).get_json()['todo']['id']
+
+        client.get(f'/api/todos/{todo_id}')
+        client.get(f'/api/todos/{todo_id}')
+
+        stats = client.get('/api/cache/stats').get_json()['cache']
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+        assert stats['hit_ratio'] == 0.5
+
+    def test_cached_get_respects_fields(self, client):
+        todo_id = create_todo(client, title='Cached').get_json()['todo']['id']
+        client.get(f'/api/todos/{todo_id}')
+
+        response = client.get(f'/api/todos/{todo_id}?fields=title')
+        assert response.get_json()['todo'] == {'title': 'Cached'}
+
+    def test_toggle_invalidates_entry(self, client):
+        todo_id = create_todo(client).get_json()['todo']['id']
+        client.get(f'/api/todos/{todo_id}')
+
+        client.patch(f'/api/todos/{todo_id}/toggle')
+
+        response = client.get(f'/api/todos/{todo_id}')
+        assert response.get_json()['todo']['completed'] is True
+
+    def test_hit_runs_no_queries(self, app, client):
+        todo_id = create_todo(client).get_json()['todo']['id']
+        client.get(f'/api/todos/{todo_id}')
+
+        statements = count_statements(app, lambda: client.get(f'/api/todos/{todo_id}'))
+        assert statements == []
+
+    def test_miss_runs_one_query(self, app, client):
+        todo_id = create_todo(client).get_json()['todo']['id']
+        client.get('/api/todos/999')
+
+        statements = count_statements(app, lambda: client.get(f'/api/todos/{todo_id}'))
+        assert len(statements) == 1
+
+    def test_write_in_other_worker_invalidates_entry(self, app, app_config, client):
+        todo_id = create_todo(client, title='Original').get_json()['todo']['id']
+        client.get(f'/api/todos/{todo_id}')
+
+        other = create_app(app_config)
+        other.test_client().put(
+            f'/api/todos/{todo_id}',
+            data=json.dumps({'title': 'Changed elsewhere'}),
+            content_type='application/json',
+        )
+
+        response = client.get(f'/api/todos/{todo_id}')
+        assert response.get_json()['todo']['title'] == 'Changed elsewhere'
+
+    def test_delete_in_other_worker_invalidates_entry(self, app, app_config, client):
+        todo_id = create_todo(client).get_json()['todo']['id']
+        client.get(f'/api/todos/{todo_id}')
+
+        other = create_app(app_config)
+        other.test_client().delete(f'/api/todos/{todo_id}')
+
+        response = client.get(f'/api/todos/{todo_id}')
+        assert response.status_code == 404
+
+
+    def test_hit_after_other_worker_write_is_fresh_and_cached(
+        self, app, app_config, client
+    ):
+        todo_id = create_todo(client, title='Original').get_json()['todo']['id']
+        client.get(f'/api/todos/{todo_id}')
+
+        other = create_app(app_config)
+        other.test_client().put(
+            f'/api/todos/{todo_id}',
+            data=json.dumps({'title': 'Changed elsewhere'}),
+            content_type='application/json',
+        )
+        client.get(f'/api/todos/{todo_id}')
+
+        statements = count_statements(app, lambda: client.get(f'/api/todos/{todo_id}'))
+        assert statements == []
+        response = client.get(f'/api/todos/{todo_id}')
+        assert response.get_json()['todo']['title'] == 'Changed elsewhere'
+
+
+class TestChangeSignal:
+    def test_bumps_are_shared_through_the_file(self, tmp_path):
+        path = str(tmp_path / 'signal')
+        first, second = ChangeSignal(path), ChangeSignal(path)
+
+        first.bump()
+        second.bump()
+
+        assert first.value() == second.value() == 2
+        assert ChangeSignal(path).value() == 2
+
+    def test_without_path_is_process_local(self):
+        signal = ChangeSignal()
+        signal.bump()
+        assert signal.value() == 1
+
+
+class TestChangeLog:
+    def test_old_changes_are_pruned(self, app, client, db_session):
+        db_session.add_all([
+            TodoChange(todo_id=1, changed_at=datetime.utcnow() - timedelta(days=1))
+            for _ in range(PRUNE_EVERY - 1)
+        ])
+        db_session.commit()
+
+        create_todo(client)
+
+        assert db_session.execute(
+            db.select(db.func.count(TodoChange.seq))
+        ).scalar() == 1
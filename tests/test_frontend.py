@@ -1,4 +1,11 @@
+import gzip
 import json
+import shutil
+
+import pytest
+from flask import Flask
+
+from app.assets import build_assets, init_assets, minify_css, minify_js
 
 
 class TestPageLoad:
@@ -113,3 +120,97 @@ class TestFrontendApiIntegration:
         assert api_response.status_code == 200
         data = api_response.get_json()
         assert 'todos' in data
+
+
+class TestInitialTodos:
+    def test_index_embeds_todos(self, client):
+        client.post(
+            '/api/todos',
+            data=json.dumps({'title': '<Embedded> todo'}),
+            content_type='application/json',
+        )
+
+        html = client.get('/').data.decode()
+        assert 'id="initial-todos"' in html
+        assert '\\u003cEmbedded\\u003e todo' in html
+        assert '"complete": true' in html
+
+    def test_index_marks_truncated_page(self, app, client):
+        app.config['INDEX_PRELOAD_LIMIT'] = 1
+        for title in ('One', 'Two'):
+            client.post(
+                '/api/todos',
+                data=json.dumps({'title': title}),
+                content_type='application/json',
+            )
+
+        html = client.get('/').data.decode()
+        assert '"complete": false' in html
+        assert 'One' in html
+        assert 'Two' not in html
+
+
+@pytest.fixture
+def built_app(app, tmp_path):
+    static = tmp_path / 'static'
+    shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns('dist'))
+    app.static_folder = str(static)
+    app.extensions['asset_manifest'] = build_assets(str(static))
+    return app
+
+
+class TestAssetPipeline:
+    def test_minify_css(self):
+        css = '/* note */\n.a  {\n    color: red;\n}\n'
+        assert minify_css(css) == '.a{color: red}'
+
+    def test_minify_js_keeps_lines(self):
+        js = '    // comment\n    var a = 1;\n\n    var b = 2;\n'
+        assert minify_js(js) == 'var a = 1;\nvar b = 2;\n'
+
+    def test_index_links_fingerprinted_assets(self, built_app):
+        manifest = built_app.extensions['asset_manifest']
+        html = built_app.test_client().get('/').data.decode()
+
+        assert f"/static/{manifest['css/style.css']}" in html
+        assert f"/static/{manifest['js/app.js']}" in html
+        assert manifest['css/style.css'].endswith('/css/style.css')
+
+    @pytest.mark.parametrize('debug', [False, True])
+    def test_debug_ignores_built_manifest(self, built_app, debug):
+        app = Flask(__name__, static_folder=built_app.static_folder)
+        app.debug = debug
+
+        init_assets(app)
+
+        assert bool(app.extensions['asset_manifest']) is not debug
+
+    def test_serves_gzip_with_immutable_caching(self, built_app):
+        url = '/static/' + built_app.extensions['asset_manifest']['js/app.js']
+        response = built_app.test_client().get(
+            url, headers={'Accept-Encoding': 'gzip'}
+        )
+
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'javascript' in response.content_type
+        assert 'immutable' in response.headers['Cache-Control']
+        assert 'max-age=31536000' in response.headers['Cache-Control']
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert b'loadTodos' in gzip.decompress(response.data)
+
+    def test_serves_identity_without_accept_encoding(self, built_app):
+        url = '/static/' + built_app.extensions['asset_manifest']['css/style.css']
+        response = built_app.test_client().get(url)
+
+        assert response.status_code == 200
+        assert 'Content-Encoding' not in response.headers
+        assert response.headers['ETag']
+
+    def test_etag_revalidation_returns_304(self, built_app):
+        client = built_app.test_client()
+        url = '/static/' + built_app.extensions['asset_manifest']['css/style.css']
+        etag = client.get(url).headers['ETag']
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
@@ -0,0 +1,240 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.idempotency import _fingerprint, _release, purge_expired
+from app.models import IdempotencyKey
+
+
+@pytest.fixture(params=['sqlalchemy', 'memory'])
+def storage(request):
+    return request.param
+
+
+def post_todo(client, title='Test todo', key=None):
+    headers = {'Idempotency-Key': key} if key is not None else {}
+    return client.post(
+        '/api/todos',
+        data=json.dumps({'title': title}),
+        content_type='application/json',
+        headers=headers,
+    )
+
+
+def post_batch(client, requests):
+    return client.post(
+        '/api/batch',
+        data=json.dumps({'requests': requests}),
+        content_type='application/json',
+    )
+
+
+def in_progress(app, db_session, key, locked_for):
+    """Store a reservation for ``post_todo`` as if its request were running."""
+    with app.test_request_context(
+        '/api/todos', method='POST',
+        data=json.dumps({'title': 'Test todo'}),
+        content_type='application/json',
+    ):
+        fingerprint = _fingerprint()
+    now = datetime.utcnow()
+    db_session.add(IdempotencyKey(
+        key=key, fingerprint=fingerprint,
+        expires_at=now + timedelta(hours=1),
+        locked_until=now + locked_for,
+    ))
+    db_session.commit()
+    return now + locked_for
+
+
+class TestIdempotencyKey:
+    def test_retry_replays_original_response(self, client):
+        first = post_todo(client, key='abc')
+        second = post_todo(client, key='abc')
+
+        assert second.status_code == 201
+        assert second.get_json() == first.get_json()
+        assert second.headers['Idempotent-Replayed'] == 'true'
+        assert len(client.get('/api/todos').get_json()['todos']) == 1
+
+    def test_different_keys_create_separate_todos(self, client):
+        post_todo(client, key='one')
+        post_todo(client, key='two')
+
+        assert len(client.get('/api/todos').get_json()['todos']) == 2
+
+    def test_key_reused_with_different_payload_returns_422(self, client):
+        post_todo(client, title='First', key='abc')
+        response = post_todo(client, title='Second', key='abc')
+
+        assert response.status_code == 422
+
+    def test_overlong_key_returns_400(self, client):
+        response = post_todo(client, key='x' * 256)
+        assert response.status_code == 400
+
+    def test_client_errors_are_replayed(self, client):
+        headers = {'Idempotency-Key': 'missing'}
+        client.patch('/api/todos/999/toggle', headers=headers)
+        response = client.patch('/api/todos/999/toggle', headers=headers)
+
+        assert response.status_code == 404
+        assert response.headers['Idempotent-Replayed'] == 'true'
+
+    def test_request_in_progress_returns_409(self, app, client, db_session):
+        in_progress(app, db_session, 'busy', timedelta(seconds=30))
+
+        response = post_todo(client, key='busy')
+        assert response.status_code == 409
+        assert client.get('/api/todos').get_json()['todos'] == []
+
+    def test_stale_reservation_is_taken_over(self, app, client, db_session):
+        in_progress(app, db_session, 'stuck', timedelta(seconds=-1))
+
+        response = post_todo(client, key='stuck')
+        assert response.status_code == 201
+        assert 'Idempotent-Replayed' not in response.headers
+
+        replay = post_todo(client, key='stuck')
+        assert replay.headers['Idempotent-Replayed'] == 'true'
+        assert len(client.get('/api/todos').get_json()['todos']) == 1
+
+    def test_stale_reservation_with_different_payload_returns_422(
+        self, app, client, db_session
+    ):
+        in_progress(app, db_session, 'stuck', timedelta(seconds=-1))
+
+        response = post_todo(client, title='Other', key='stuck')
+        assert response.status_code == 422
+
+    def test_superseded_request_cannot_release_key(self, app, client, db_session):
+        stale = in_progress(app, db_session, 'stuck', timedelta(seconds=-1))
+        post_todo(client, key='stuck')
+
+        with app.test_request_context():
+            _release('stuck', stale)
+        record = db_session.get(IdempotencyKey, 'stuck')
+        assert record is not None
+        assert record.status_code == 201
+
+    def test_expired_key_is_executed_again(self, app, client):
+        app.config['IDEMPOTENCY_TTL'] = 0
+        post_todo(client, key='abc')
+        response = post_todo(client, key='abc')
+
+        assert 'Idempotent-Replayed' not in response.headers
+        assert len(client.get('/api/todos').get_json()['todos']) == 2
+
+    def test_purge_expired(self, app, client, db_session):
+        app.config['IDEMPOTENCY_TTL'] = 0
+        post_todo(client, key='old')
+
+        assert purge_expired() == 1
+        assert db_session.get(IdempotencyKey, 'old') is None
+
+    def test_new_reservations_purge_expired_keys(
+        self, app, client, db_session, monkeypatch
+    ):
+        monkeypatch.setattr('app.idempotency.PURGE_EVERY', 1)
+        db_session.add(IdempotencyKey(
+            key='old', fingerprint='x', status_code=201, body='{}',
+            expires_at=datetime.utcnow() - timedelta(seconds=1),
+        ))
+        db_session.commit()
+
+        post_todo(client, key='new')
+
+        assert db_session.get(IdempotencyKey, 'old') is None
+        assert db_session.get(IdempotencyKey, 'new') is not None
+
+
+@pytest.mark.parametrize('storage', ['sqlalchemy'])
+class TestSingleTransaction:
+    def test_failure_after_write_rolls_back_the_write(self, app, client, monkeypatch):
+        repository = app.extensions['todo_repository']
+        create = repository.create
+
+        def create_then_crash(*args):
+            create(*args)
+            raise RuntimeError('worker died')
+
+        monkeypatch.setattr(repository, 'create', create_then_crash)
+        with pytest.raises(RuntimeError):
+            post_todo(client, key='abc')
+        monkeypatch.undo()
+
+        assert client.get('/api/todos').get_json()['todos'] == []
+        response = post_todo(client, key='abc')
+        assert response.status_code == 201
+        assert 'Idempotent-Replayed' not in response.headers
+
+    def test_superseded_request_rolls_back_its_write(
+        self, app, client, db_session, monkeypatch
+    ):
+        repository = app.extensions['todo_repository']
+        create = repository.create
+
+        def create_then_lose_lock(*args):
+            # Stands in for a retry taking the key over after the lock lapsed.
+            db_session.execute(
+                db.update(IdempotencyKey)
+                .where(IdempotencyKey.key == 'abc')
+                .values(locked_until=datetime.utcnow() + timedelta(minutes=1))
+            )
+            return create(*args)
+
+        monkeypatch.setattr(repository, 'create', create_then_lose_lock)
+        response = post_todo(client, key='abc')
+
+        assert response.status_code == 409
+        assert client.get('/api/todos').get_json()['todos'] == []
+
+
+class TestBatch:
+    def test_results_are_returned_in_order(self, client):
+        todo_id = post_todo(client, title='Existing').get_json()['todo']['id']
+
+        response = post_batch(client, [
+            {'method': 'POST', 'path': '/api/todos', 'body': {'title': 'New'}},
+            {'method': 'PATCH', 'path': f'/api/todos/{todo_id}/toggle'},
+            {'method': 'DELETE', 'path': '/api/todos/999'},
+            {'method': 'PUT', 'path': f'/api/todos/{todo_id}', 'body': {'title': 'Renamed'}},
+        ])
+
+        assert response.status_code == 200
+        results = response.get_json()['responses']
+        assert [r['status'] for r in results] == [201, 200, 404, 200]
+        assert results[0]['body']['todo']['title'] == 'New'
+        assert results[1]['body']['todo']['completed'] is True
+        assert results[3]['body']['todo']['title'] == 'Renamed'
+
+    def test_items_with_idempotency_keys_are_replayed(self, client):
+        item = {
+            'method': 'POST', 'path': '/api/todos',
+            'body': {'title': 'Once'}, 'idempotency_key': 'batch-1',
+        }
+        post_batch(client, [item])
+        results = post_batch(client, [item]).get_json()['responses']
+
+        assert results[0]['replayed'] is True
+        assert len(client.get('/api/todos').get_json()['todos']) == 1
+
+    @pytest.mark.parametrize('requests', [
+        [],
+        [{'method': 'GET', 'path': '/api/todos'}],
+        [{'method': 'POST', 'path': '/api/batch'}],
+        ['not an object'],
+    ])
+    def test_invalid_batch_returns_400(self, client, requests):
+        response = post_batch(client, requests)
+        assert response.status_code == 400
+
+    def test_batch_size_is_limited(self, app, client):
+        app.config['BATCH_MAX_REQUESTS'] = 2
+        item = {'method': 'POST', 'path': '/api/todos', 'body': {'title': 'x'}}
+
+        response = post_batch(client, [item] * 3)
+        assert response.status_code == 400
+        assert client.get('/api/todos').get_json()['todos'] == []
@@ -0,0 +1,198 @@
+import os
+import time
+
+import pytest
+
+from app.jobs import claim_next, enqueue, finish, jobs_cli, run_worker, task
+from app.models import Job, Todo
+
+
+@task('test_add')
+def add(ctx, a, b):
+    ctx.report(0.5, 'halfway')
+    return a + b
+
+
+@task('test_fail')
+def fail(ctx):
+    raise RuntimeError('boom')
+
+
+@task('test_sleep')
+def sleep(ctx, seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+@task('test_exit')
+def exit_process(ctx):
+    os._exit(1)
+
+
+@task('test_unserializable')
+def unserializable(ctx):
+    return object()
+
+
+@pytest.fixture
+def database_uri(tmp_path):
+    # Tasks run in pool processes, which need a database they can open too.
+    return f'sqlite:///{tmp_path / "jobs.db"}'
+
+
+@pytest.fixture
+def jobs_app(app):
+    app.config.update(JOB_RETRY_BACKOFF=0, JOB_POLL_INTERVAL=0.05)
+    return app
+
+
+class TestEnqueue:
+    def test_enqueue_creates_queued_job(self, jobs_app, db_session):
+        job = enqueue('test_add', a=1, b=2)
+
+        saved = db_session.get(Job, job.id)
+        assert saved.status == Job.QUEUED
+        assert saved.to_dict()['args'] == {'a': 1, 'b': 2}
+
+    def test_enqueue_unknown_task_raises(self, jobs_app):
+        with pytest.raises(KeyError):
+            enqueue('does_not_exist')
+
+
+class TestWorker:
+    def test_runs_job_to_completion(self, jobs_app, db_session):
+        job = enqueue('test_add', a=2, b=3)
+
+        assert run_worker(concurrency=1, once=True) == 1
+
+        db_session.refresh(job)
+        assert job.status == Job.SUCCEEDED
+        assert job.progress == 1.0
+        assert job.to_dict()['result'] == 5
+        assert job.finished_at is not None
+
+    def test_failing_job_is_retried_then_failed(self, jobs_app, db_session):
+        job = enqueue('test_fail', max_attempts=2)
+
+        assert run_worker(concurrency=1, once=True) == 2
+
+        db_session.refresh(job)
+        assert job.status == Job.FAILED
+        assert job.attempts == 2
+        assert 'boom' in job.error
+
+    def test_runs_several_jobs_concurrently(self, jobs_app, db_session):
+        jobs = [enqueue('test_add', a=i, b=i) for i in range(4)]
+
+        run_worker(concurrency=2, once=True)
+
+        for i, job in enumerate(jobs):
+            db_session.refresh(job)
+            assert job.status == Job.SUCCEEDED
+            assert job.to_dict()['result'] == 2 * i
+
+    def test_recount_task(self, jobs_app, db_session):
+        db_session.add_all([Todo(title=f'Todo {i}', completed=i < 2) for i in range(5)])
+        db_session.commit()
+        job = enqueue('recount', batch_size=2)
+
+        run_worker(concurrency=1, once=True)
+
+        db_session.refresh(job)
+        assert job.to_dict()['result'] == {'total': 5, 'active': 3, 'completed': 2}
+        assert job.message == '5/5 todos'
+
+
+class TestWorkerFailures:
+    def test_dead_pool_process_fails_the_attempt(self, jobs_app, db_session):
+        job = enqueue('test_exit', max_attempts=2)
+
+        assert run_worker(concurrency=1, once=True) == 2
+
+        db_session.refresh(job)
+        assert job.status == Job.FAILED
+        assert job.attempts == 2
+        assert 'BrokenProcessPool' in job.error
+
+    def test_jobs_sharing_a_broken_pool_are_retried(self, jobs_app, db_session):
+        culprit = enqueue('test_exit', max_attempts=1)
+        healthy = enqueue('test_sleep', seconds=0.5)
+
+        run_worker(concurrency=2, once=True)
+
+        db_session.refresh(culprit)
+        db_session.refresh(healthy)
+        assert culprit.status == Job.FAILED
+        assert healthy.status == Job.SUCCEEDED
+        assert healthy.attempts == 2
+
+    def test_unserializable_result_fails_the_job(self, jobs_app, db_session):
+        bad = enqueue('test_unserializable', max_attempts=1)
+        good = enqueue('test_add', a=1, b=2)
+
+        assert run_worker(concurrency=1, once=True) == 2
+
+        db_session.refresh(bad)
+        db_session.refresh(good)
+        assert bad.status == Job.FAILED
+        assert 'TypeError' in bad.error
+        assert good.status == Job.SUCCEEDED
+
+
+class TestLeases:
+    def test_silent_long_task_keeps_its_lease(self, jobs_app, db_session):
+        jobs_app.config['JOB_LEASE_SECONDS'] = 0.3
+        job = enqueue('test_sleep', seconds=1.0)
+
+        run_worker(concurrency=2, once=True)
+
+        db_session.refresh(job)
+        assert job.status == Job.SUCCEEDED
+        assert job.attempts == 1
+
+    def test_finish_is_ignored_after_reclaim(self, jobs_app, db_session):
+        enqueue('test_add', a=1, b=2)
+        job = claim_next(lease_seconds=0)
+        stale_token = job.claim_token
+        time.sleep(0.01)
+        reclaimed = claim_next(lease_seconds=60)
+        assert reclaimed.id == job.id
+
+        assert finish(job.id, stale_token, result=3) is False
+        db_session.refresh(job)
+        assert job.status == Job.RUNNING
+        assert job.attempts == 2
+
+        assert finish(job.id, reclaimed.claim_token, result=3) is True
+        db_session.refresh(job)
+        assert job.status == Job.SUCCEEDED
+
+    def test_expired_lease_on_final_attempt_fails(self, jobs_app, db_session):
+        enqueue('test_add', max_attempts=1, a=1, b=2)
+        job = claim_next(lease_seconds=0)
+        time.sleep(0.01)
+
+        assert claim_next(lease_seconds=60) is None
+        db_session.refresh(job)
+        assert job.status == Job.FAILED
+        assert job.attempts == 1
+        assert job.claim_token is None
+
+
+class TestJobsCli:
+    def test_enqueue_and_list(self, jobs_app):
+        runner = jobs_app.test_cli_runner()
+
+        result = runner.invoke(jobs_cli, ['enqueue', 'test_add', '--arg', 'a=1', '--arg', 'b=2'])
+        assert 'Queued job 1' in result.output
+
+        result = runner.invoke(jobs_cli, ['list'])
+        assert 'test_add' in result.output
+        assert 'queued' in result.output
+
+    def test_worker_once(self, jobs_app):
+        runner = jobs_app.test_cli_runner()
+        runner.invoke(jobs_cli, ['enqueue', 'test_add', '--arg', 'a=1', '--arg', 'b=2'])
+
+        result = runner.invoke(jobs_cli, ['worker', '--once', '--concurrency', '1'])
+        assert 'Processed 1 job(s)' in result.output
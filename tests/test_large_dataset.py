@@ -0,0 +1,134 @@
+"""Performance checks for the API against a bulk-loaded dataset.
+
+This is a curated subset of the ``test_api.py`` scenarios, not a replay of
+all of them: those tests assert exact list contents and counts on an empty
+database, so they cannot run unchanged against a million pre-loaded rows.
+Kept here are the read paths whose cost grows with the table (listing,
+status filters, ``q=`` search, field projection) and one request per write
+route; validation and error-body cases do not touch the data, so they
+gain nothing from the large dataset.  Expected results are derived from
+the generator's statistics rather than hard-coded.
+
+Run with ``pytest --large-dataset`` (1M rows) or ``--large-dataset=ROWS``.
+Each request must finish within its time budget; full-table scans get a
+budget proportional to the dataset size.  Set ``TODO_BUDGET_SCALE`` to
+stretch every budget on slow machines.
+"""
+import json
+import os
+import time
+
+import pytest
+
+pytestmark = pytest.mark.large_dataset
+
+BUDGET_SCALE = float(os.environ.get('TODO_BUDGET_SCALE', 1.0))
+# Seconds allowed for single-row requests.
+POINT_BUDGET = 0.1 * BUDGET_SCALE
+# Seconds allowed per 100k rows for requests that scan the table.
+SCAN_BUDGET_PER_100K = 5.0 * BUDGET_SCALE
+
+
+def scan_budget(stats) -> float:
+    return 0.5 + SCAN_BUDGET_PER_100K * stats['total'] / 100_000
+
+
+def timed(budget: float, call, *args, **kwargs):
+    start = time.perf_counter()
+    response = call(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    assert elapsed <= budget, f'request took {elapsed:.3f}s, budget {budget:.3f}s'
+    return response
+
+
+def put_json(client, url, payload):
+    return client.put(url, data=json.dumps(payload), content_type='application/json')
+
+
+class TestLargeCreateTodo:
+    def test_create_with_title(self, large_client, large_dataset):
+        _, stats = large_dataset
+        response = timed(
+            POINT_BUDGET, large_client.post, '/api/todos',
+            data=json.dumps({'title': 'Buy groceries'}),
+            content_type='application/json',
+        )
+        assert response.status_code == 201
+        assert response.get_json()['todo']['id'] == stats['total'] + 1
+
+
+class TestLargeGetTodos:
+    def test_list_all(self, large_client, large_dataset):
+        _, stats = large_dataset
+        response = timed(scan_budget(stats), large_client.get, '/api/todos')
+        assert len(response.get_json()['todos']) == stats['total']
+
+    def test_list_projected(self, large_client, large_dataset):
+        _, stats = large_dataset
+        response = timed(
+            scan_budget(stats), large_client.get,
+            '/api/todos?fields=id,title,completed',
+        )
+        assert len(response.get_json()['todos']) == stats['total']
+
+    def test_filter_active(self, large_client, large_dataset):
+        _, stats = large_dataset
+        response = timed(scan_budget(stats), large_client.get, '/api/todos?status=active')
+        todos = response.get_json()['todos']
+        assert len(todos) == stats['active']
+        assert not any(todo['completed'] for todo in todos)
+
+    def test_filter_completed(self, large_client, large_dataset):
+        _, stats = large_dataset
+        response = timed(scan_budget(stats), large_client.get, '/api/todos?status=completed')
+        assert len(response.get_json()['todos']) == stats['completed']
+
+    @pytest.mark.parametrize('keyword', ['review', 'passport', 'nonexistent'])
+    def test_search(self, large_client, large_dataset, keyword):
+        _, stats = large_dataset
+        response = timed(scan_budget(stats), large_client.get, f'/api/todos?q={keyword}')
+        for todo in response.get_json()['todos']:
+            text = f"{todo['title']} {todo['description']}".lower()
+            assert keyword in text
+
+    def test_filter_and_search_combined(self, large_client, large_dataset):
+        _, stats = large_dataset
+        response = timed(
+            scan_budget(stats), large_client.get, '/api/todos?status=active&q=review'
+        )
+        for todo in response.get_json()['todos']:
+            assert todo['completed'] is False
+
+
+class TestLargeSingleTodo:
+    def test_get_existing_todo(self, large_client, large_dataset):
+        _, stats = large_dataset
+        todo_id = stats['total'] // 2
+        response = timed(POINT_BUDGET, large_client.get, f'/api/todos/{todo_id}')
+        assert response.get_json()['todo']['id'] == todo_id
+
+    def test_get_nonexistent_todo_returns_404(self, large_client, large_dataset):
+        _, stats = large_dataset
+        response = timed(
+            POINT_BUDGET, large_client.get, f'/api/todos/{stats["total"] + 1}'
+        )
+        assert response.status_code == 404
+
+    def test_update_title(self, large_client, large_dataset):
+        _, stats = large_dataset
+        todo_id = stats['total']
+        response = timed(
+            POINT_BUDGET, put_json, large_client, f'/api/todos/{todo_id}',
+            {'title': 'New title'},
+        )
+        assert response.get_json()['todo']['title'] == 'New title'
+
+    def test_toggle(self, large_client):
+        before = large_client.get('/api/todos/1').get_json()['todo']['completed']
+        response = timed(POINT_BUDGET, large_client.patch, '/api/todos/1/toggle')
+        assert response.get_json()['todo']['completed'] is (not before)
+
+    def test_delete(self, large_client):
+        response = timed(POINT_BUDGET, large_client.delete, '/api/todos/1')
+        assert response.status_code == 200
+        assert large_client.get('/api/todos/1').status_code == 404
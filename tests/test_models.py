@@ -94,6 +94,14 @@ class TestTodoToDict:
         assert isinstance(result['created_at'], str)
         assert isinstance(result['updated_at'], str)
 
+    def test_to_dict_with_fields_subset(self, db_session):
+        todo = Todo(title='Test todo', description='A description')
+        db_session.add(todo)
+        db_session.commit()
+
+        result = todo.to_dict(('id', 'completed'))
+        assert result == {'id': todo.id, 'completed': False}
+
 
 class TestTodoRepr:
     def test_repr_format(self, db_session):
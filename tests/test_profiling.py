@@ -0,0 +1,137 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from app import create_app, db
+from app.profiling import list_profiles, profiles_cli
+from config import TestingConfig
+
+
+@pytest.fixture
+def profiled_app(tmp_path):
+    class ProfilingConfig(TestingConfig):
+        PROFILING_ENABLED = True
+        PROFILE_DIR = str(tmp_path)
+        PROFILE_TOKEN = 'secret'
+
+    app = create_app(ProfilingConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+class TestProfilingDisabled:
+    def test_no_hooks_when_disabled(self, app):
+        hooks = app.before_request_funcs.get(None, [])
+        assert not any(f.__name__ == 'start_profile' for f in hooks)
+
+    def test_header_is_ignored_when_disabled(self, client):
+        response = client.get('/api/todos', headers={'X-Profile': '1'})
+        assert 'X-Profile-Id' not in response.headers
+
+
+class TestProfilingCapture:
+    def test_request_without_header_is_not_profiled(self, profiled_app):
+        response = profiled_app.test_client().get('/api/todos')
+        assert 'X-Profile-Id' not in response.headers
+        assert list_profiles(profiled_app.config['PROFILE_DIR']) == []
+
+    def test_header_captures_profile_files(self, profiled_app):
+        response = profiled_app.test_client().get(
+            '/api/todos?q=milk', headers={'X-Profile': 'secret'}
+        )
+        profile_id = response.headers['X-Profile-Id']
+
+        directory = profiled_app.config['PROFILE_DIR']
+        for ext in ('pstats', 'folded', 'json'):
+            assert os.path.exists(os.path.join(directory, f'{profile_id}.{ext}'))
+
+        [meta] = list_profiles(directory)
+        assert meta['path'] == '/api/todos?q=milk'
+        assert meta['status'] == 200
+        assert any('SELECT' in q['statement'] for q in meta['queries'])
+
+    def test_wrong_token_is_not_profiled(self, profiled_app):
+        response = profiled_app.test_client().get(
+            '/api/todos', headers={'X-Profile': 'wrong'}
+        )
+        assert 'X-Profile-Id' not in response.headers
+
+    def test_header_is_ignored_without_token(self, profiled_app):
+        profiled_app.config['PROFILE_TOKEN'] = ''
+        response = profiled_app.test_client().get(
+            '/api/todos', headers={'X-Profile': '1'}
+        )
+        assert 'X-Profile-Id' not in response.headers
+        assert list_profiles(profiled_app.config['PROFILE_DIR']) == []
+
+    def test_profiler_stops_when_view_raises(self, profiled_app):
+        @profiled_app.route('/boom')
+        def boom():
+            raise RuntimeError('boom')
+
+        profiled_app.config['PROFILE_SAMPLE_RATE'] = 1.0
+        threads = threading.active_count()
+        with pytest.raises(RuntimeError):
+            profiled_app.test_client().get('/boom')
+
+        assert sys.getprofile() is None
+        assert threading.active_count() == threads
+
+    def test_failed_statement_does_not_break_timing(self, profiled_app):
+        with pytest.raises(Exception):
+            db.session.execute(db.text('SELECT * FROM missing_table'))
+        db.session.rollback()
+
+        response = profiled_app.test_client().get(
+            '/api/todos', headers={'X-Profile': 'secret'}
+        )
+        [meta] = list_profiles(profiled_app.config['PROFILE_DIR'])
+        assert meta['id'] == response.headers['X-Profile-Id']
+        assert all(0 <= q['duration'] <= meta['duration'] for q in meta['queries'])
+
+    def test_only_newest_captures_are_kept(self, profiled_app):
+        profiled_app.config['PROFILE_MAX_CAPTURES'] = 2
+        client = profiled_app.test_client()
+        ids = [
+            client.get('/api/todos', headers={'X-Profile': 'secret'})
+            .headers['X-Profile-Id']
+            for _ in range(3)
+        ]
+
+        directory = profiled_app.config['PROFILE_DIR']
+        assert len(os.listdir(directory)) == 6
+        assert ids[2] in [meta['id'] for meta in list_profiles(directory)]
+
+    def test_sample_rate_profiles_every_request(self, profiled_app):
+        profiled_app.config['PROFILE_SAMPLE_RATE'] = 1.0
+        response = profiled_app.test_client().get('/api/todos')
+        assert 'X-Profile-Id' in response.headers
+
+
+class TestProfilesCli:
+    def test_list_show_and_diff(self, profiled_app):
+        client = profiled_app.test_client()
+        first = client.get('/api/todos', headers={'X-Profile': 'secret'}).headers['X-Profile-Id']
+        second = client.get('/api/todos', headers={'X-Profile': 'secret'}).headers['X-Profile-Id']
+        runner = profiled_app.test_cli_runner()
+
+        result = runner.invoke(profiles_cli, ['list'])
+        assert first in result.output
+        assert second in result.output
+
+        result = runner.invoke(profiles_cli, ['show', first, '--limit', '5'])
+        assert result.exit_code == 0
+        assert 'function calls' in result.output
+
+        result = runner.invoke(profiles_cli, ['diff', first, second])
+        assert result.exit_code == 0
+        assert 'delta ms' in result.output
+
+    def test_unknown_profile(self, profiled_app):
+        result = profiled_app.test_cli_runner().invoke(profiles_cli, ['show', 'nope'])
+        assert result.exit_code != 0
+        assert 'Unknown profile: nope' in result.output
@@ -0,0 +1,88 @@
+import pytest
+
+from app.repository import MemoryTodoRepository
+
+
+def make_repo(*titles):
+    repo = MemoryTodoRepository()
+    for title in titles:
+        repo.create(title, '')
+    return repo
+
+
+class TestMemorySearch:
+    def test_trigram_search_verifies_substring(self):
+        repo = make_repo('abcxyz', 'xyzabc', 'abxcyz')
+
+        titles = [t['title'] for t in repo.list(keyword='cxy')]
+        assert titles == ['abcxyz']
+
+    def test_short_keyword_scans(self):
+        repo = make_repo('Buy milk', 'Read', 'Walk dog')
+
+        titles = [t['title'] for t in repo.list(keyword='d')]
+        assert titles == ['Read', 'Walk dog']
+
+    def test_search_folds_ascii_only(self):
+        repo = make_repo('BUY milk', 'ÉCOLE')
+
+        assert len(repo.list(keyword='buy')) == 1
+        assert repo.list(keyword='école') == []
+
+    def test_update_reindexes_text(self):
+        repo = make_repo('Old title')
+
+        repo.update(1, {'title': 'Fresh title'})
+
+        assert repo.list(keyword='old') == []
+        assert len(repo.list(keyword='fresh')) == 1
+
+
+class TestMemoryIndexes:
+    def test_status_index_follows_toggle_and_delete(self):
+        repo = make_repo('One', 'Two', 'Three')
+        repo.toggle(2)
+        repo.toggle(3)
+        repo.delete(3)
+
+        assert [t['id'] for t in repo.list(status='completed')] == [2]
+        assert [t['id'] for t in repo.list(status='active')] == [1]
+
+    def test_ids_are_not_reused_after_delete(self):
+        repo = make_repo('One', 'Two')
+        repo.delete(2)
+
+        assert repo.create('Three', '')['id'] == 3
+
+    def test_load_keeps_id_order(self):
+        repo = MemoryTodoRepository()
+        repo.load([
+            {'id': 5, 'title': 'Five', 'description': '', 'completed': False},
+            {'id': 2, 'title': 'Two', 'description': '', 'completed': True},
+        ])
+
+        assert [t['id'] for t in repo.list()] == [2, 5]
+        assert repo.create('Six', '')['id'] == 6
+
+
+class TestMemoryUpdate:
+    def test_non_string_title_is_stored_as_text(self):
+        repo = make_repo('hello')
+
+        assert repo.update(1, {'title': 5})['title'] == '5'
+        assert len(repo.list(keyword='5')) == 1
+
+    def test_rejected_update_leaves_record_searchable(self):
+        repo = make_repo('hello')
+
+        with pytest.raises(ValueError):
+            repo.update(1, {'title': None})
+
+        assert repo.get(1)['title'] == 'hello'
+        assert len(repo.list(keyword='hel')) == 1
+
+    def test_create_coerces_before_indexing(self):
+        repo = MemoryTodoRepository()
+
+        assert repo.create('hello', 5)['description'] == '5'
+        assert [t['id'] for t in repo.list(keyword='5')] == [1]
@@ -1,6 +1,9 @@
+import os
+
 from app import create_app
+from config import CONFIGS
 
-app = create_app()
+app = create_app(CONFIGS[os.environ.get('APP_CONFIG', 'development')])
 
 if __name__ == '__main__':
     app.run()